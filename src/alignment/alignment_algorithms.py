@@ -1,4 +1,5 @@
-from general_alignment import Alignment, build_weight_matrix
+from general_alignment import FITTING, Alignment, ScoringScheme, build_weight_matrix
+from threaded import TILE_SIZE
 
 
 class NeedlemanWunsch(Alignment):
@@ -6,39 +7,122 @@ class NeedlemanWunsch(Alignment):
         self,
         s: str,
         t: str,
-        w: dict,
+        w: dict | ScoringScheme,
         is_similarity: bool = False,
         hirschberg: bool = False,
+        band: int | None = None,
+        widen_band: bool = False,
+        score_only: bool = False,
+        workers: int | None = None,
+        parallel_min_size: int = 1 << 20,
+        memory_budget: int | None = None,
+        scratch_directory: str | None = None,
+        checkpoint_interval: int | None = None,
+        wavefront: bool = False,
+        max_wavefront_score: int | None = None,
+        backend: Alignment.Backend = Alignment.Backend.AUTO,
+        tile_size: int = TILE_SIZE,
     ):
         super().__init__(
-            s, t, w, Alignment.AlignmentType.GLOBAL, is_similarity, hirschberg
+            s,
+            t,
+            w,
+            Alignment.AlignmentType.GLOBAL,
+            is_similarity,
+            hirschberg,
+            band,
+            widen_band,
+            score_only=score_only,
+            workers=workers,
+            parallel_min_size=parallel_min_size,
+            memory_budget=memory_budget,
+            scratch_directory=scratch_directory,
+            checkpoint_interval=checkpoint_interval,
+            wavefront=wavefront,
+            max_wavefront_score=max_wavefront_score,
+            backend=backend,
+            tile_size=tile_size,
         )
 
 
 class SemiGlobal(Alignment):
     def __init__(
-        self, s: str, t: str, w: dict, is_similarity: bool, hirschberg: bool = False
+        self,
+        s: str,
+        t: str,
+        w: dict | ScoringScheme,
+        is_similarity: bool,
+        hirschberg: bool = False,
+        score_only: bool = False,
+        memory_budget: int | None = None,
+        scratch_directory: str | None = None,
+        checkpoint_interval: int | None = None,
+        backend: Alignment.Backend = Alignment.Backend.AUTO,
+        workers: int | None = None,
+        tile_size: int = TILE_SIZE,
+        free_start_s: bool = False,
+        free_start_t: bool = True,
+        free_end_s: bool = False,
+        free_end_t: bool = True,
     ):
         super().__init__(
-            s, t, w, Alignment.AlignmentType.SEMI_GLOBAL, is_similarity, hirschberg
+            s,
+            t,
+            w,
+            Alignment.AlignmentType.SEMI_GLOBAL,
+            is_similarity,
+            hirschberg,
+            score_only=score_only,
+            memory_budget=memory_budget,
+            scratch_directory=scratch_directory,
+            checkpoint_interval=checkpoint_interval,
+            backend=backend,
+            workers=workers,
+            tile_size=tile_size,
+            free_ends=(free_start_s, free_start_t, free_end_s, free_end_t),
         )
 
 
 class SmithWaterman(Alignment):
     def __init__(
-        self, s: str, t: str, w: dict, is_similarity: bool, hirschberg: bool = False
+        self,
+        s: str,
+        t: str,
+        w: dict | ScoringScheme,
+        is_similarity: bool,
+        hirschberg: bool = False,
+        score_only: bool = False,
+        memory_budget: int | None = None,
+        scratch_directory: str | None = None,
+        checkpoint_interval: int | None = None,
+        backend: Alignment.Backend = Alignment.Backend.AUTO,
+        workers: int | None = None,
+        tile_size: int = TILE_SIZE,
     ):
         super().__init__(
-            s, t, w, Alignment.AlignmentType.LOCAL, is_similarity, hirschberg
+            s,
+            t,
+            w,
+            Alignment.AlignmentType.LOCAL,
+            is_similarity,
+            hirschberg,
+            score_only=score_only,
+            memory_budget=memory_budget,
+            scratch_directory=scratch_directory,
+            checkpoint_interval=checkpoint_interval,
+            backend=backend,
+            workers=workers,
+            tile_size=tile_size,
         )
 
 
 def main(description: str, usedClass):
     import argparse
+    import sys
 
     parser = argparse.ArgumentParser(description=description)
-    parser.add_argument(type=str, dest="s", help="First sequence")
-    parser.add_argument(type=str, dest="t", help="Second sequence")
+    parser.add_argument(type=str, dest="s", nargs="?", help="First sequence")
+    parser.add_argument(type=str, dest="t", nargs="?", help="Second sequence")
 
     parser.add_argument("--match", type=int, default=0, help="Match score")
     parser.add_argument("--indel", type=int, default=2, help="Indel score")
@@ -54,9 +138,95 @@ def main(description: str, usedClass):
     parser.add_argument(
         "--hirschberg", action="store_true", help="Use Hirschberg algorithm"
     )
+    parser.add_argument(
+        "--score-only",
+        action="store_true",
+        help="Only compute the score, without matrices and alignment",
+    )
+
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        default=None,
+        help="Memory budget in bytes, picks the fastest strategy that fits",
+    )
+
+    parser.add_argument(
+        "--scratch-directory",
+        type=str,
+        default=None,
+        help="Directory for on-disk matrices of alignments larger than the memory",
+    )
+
+    parser.add_argument(
+        "--backend",
+        choices=[backend.name.lower() for backend in Alignment.Backend],
+        default="auto",
+        help="Engine for score-only alignment, the threaded one also fills matrices",
+    )
+
+    parser.add_argument(
+        "--tile-size",
+        type=int,
+        default=TILE_SIZE,
+        help="Rows and columns of a tile of the threaded backend",
+    )
+
+    parser.add_argument(
+        "--batch",
+        type=str,
+        default=None,
+        help="Align the pairs of a FASTA or TSV file ('-' for stdin) instead",
+    )
+    parser.add_argument(
+        "--input-format",
+        choices=["fasta", "tsv"],
+        default=None,
+        help="Format of the batch input, detected from the first character if omitted",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=["jsonl", "tsv"],
+        default="jsonl",
+        help="Format of the batch results",
+    )
+    parser.add_argument(
+        "--alphabet", type=str, default="ACGT", help="Alphabet of the batch input"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes of the batch, Hirschberg or threads of the threaded backend",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=64, help="Pairs sent to a worker at once"
+    )
+
+    if issubclass(usedClass, SemiGlobal):
+        # By default, s is fitted into t
+        for end, free in zip(["start-s", "start-t", "end-s", "end-t"], FITTING):
+            parser.add_argument(
+                f"--free-{end}",
+                action=argparse.BooleanOptionalAction,
+                default=free,
+                help=f"Leave the gaps at the {end.replace('-', ' of ')} free",
+            )
 
     args = parser.parse_args()
 
+    options = {}
+    if issubclass(usedClass, SemiGlobal):
+        for end in ["start_s", "start_t", "end_s", "end_t"]:
+            options[f"free_{end}"] = getattr(args, f"free_{end}")
+
+    if args.batch is not None:
+        __main_batch__(args, usedClass, options)
+        return
+
+    if args.s is None or args.t is None:
+        parser.error("two sequences or --batch are required")
+
     s = args.s
     t = args.t
 
@@ -64,5 +234,48 @@ def main(description: str, usedClass):
 
     w = build_weight_matrix(alphabet, args.match, args.indel, args.substitution)
 
-    result = usedClass(s, t, w, args.similarity, args.hirschberg)
-    print(result)
+    result = usedClass(
+        s,
+        t,
+        w,
+        args.similarity,
+        args.hirschberg,
+        score_only=args.score_only,
+        memory_budget=args.memory_budget,
+        scratch_directory=args.scratch_directory,
+        backend=Alignment.Backend[args.backend.upper()],
+        workers=args.workers,
+        tile_size=args.tile_size,
+        **options,
+    )
+    result.render(sys.stdout)
+
+
+def __main_batch__(args, usedClass, options):
+    """
+    Streams the pairs of the batch input through align_many and writes the
+    results to stdout in input order. The options are passed to the aligner.
+    """
+    import sys
+    from batch import align_many, read_pairs, write_results
+
+    w = build_weight_matrix(args.alphabet, args.match, args.indel, args.substitution)
+
+    file = sys.stdin if args.batch == "-" else open(args.batch)
+
+    with file:
+        results = align_many(
+            read_pairs(file, args.input_format),
+            w,
+            usedClass,
+            args.similarity,
+            args.workers,
+            args.chunk_size,
+            hirschberg=args.hirschberg,
+            score_only=args.score_only,
+            memory_budget=args.memory_budget,
+            scratch_directory=args.scratch_directory,
+            backend=Alignment.Backend[args.backend.upper()],
+            **options,
+        )
+        write_results(results, sys.stdout, args.output_format)
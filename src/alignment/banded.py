@@ -0,0 +1,269 @@
+import numpy as np
+from kernels import DIAG, LEFT, NONE, UP
+from edit_script import DELETION, INSERTION, MATCH, MISMATCH
+from edit_script import EditScript, EditScriptBuilder
+from scoring import ScoringScheme
+
+# Score of cells outside of the band, far away from any reachable score
+INFINITY = 2**60
+
+
+def banded_fill(
+    s: np.ndarray,
+    t: np.ndarray,
+    scoring: ScoringScheme,
+    is_similarity: bool,
+    k: int,
+    free_row: bool = False,
+):
+    """
+    Fills the global score matrix and direction codes within k of the main diagonal.
+
+    Both matrices are stored in an (n + 1) x (2k + 1) layout, where cell (i, j) of
+    the full matrix lives at [i, j - i + k]. Cells outside of the matrix hold an
+    infinite score (negative for similarities). With free_row, the first row is 0,
+    so the alignment may start at any column of t within the band.
+    """
+    n = len(s)
+    m = len(t)
+
+    if abs(n - m) > k:
+        raise ValueError("The band must contain the last cell of the matrix")
+
+    outside = -INFINITY if is_similarity else INFINITY
+    optimum = np.maximum if is_similarity else np.minimum
+    scan = np.maximum.accumulate if is_similarity else np.minimum.accumulate
+
+    # Scores are indexed by column j of the full matrix, column 0 is padding
+    profile = np.zeros((len(scoring.alphabet), m + 1), dtype=int)
+    profile[:, 1:] = scoring.substitution[:, t]
+    deletion = scoring.deletion[s].astype(int)
+    insertion = np.zeros(m + 1, dtype=int)
+    insertion[1:] = scoring.insertion[t]
+    insertion_prefix = np.cumsum(insertion)
+
+    D = np.full((n + 1, 2 * k + 1), outside, dtype=int)
+    B = np.zeros((n + 1, 2 * k + 1), dtype=np.uint8)
+
+    # First row: gaps in s only
+    width = min(k, m) + 1
+    if free_row:
+        D[0, k : k + width] = 0
+    else:
+        D[0, k : k + width] = insertion_prefix[:width]
+        B[0, k + 1 : k + width] = LEFT
+
+    first_column = np.concatenate([[0], np.cumsum(deletion)])
+
+    up = np.full(2 * k + 1, outside, dtype=int)
+    left = np.full(2 * k + 1, outside, dtype=int)
+
+    for i in range(1, n + 1):
+        previous = D[i - 1]
+        np.add(previous[1:], deletion[i - 1], out=up[:-1])
+
+        if k < i <= m - k:
+            # The whole band lies inside of the matrix, so plain slices suffice
+            band = slice(i - k, i + k + 1)
+
+            diagonal = previous + profile[s[i - 1], band]
+            best = optimum(up, diagonal)
+
+            G = insertion_prefix[band]
+            row = G + scan(best - G)
+
+            np.add(row[:-1], insertion[i - k + 1 : i + k + 1], out=left[1:])
+            codes = np.where(
+                row == left, LEFT, np.where(row == diagonal, DIAG, UP)
+            ).astype(np.uint8)
+        else:
+            row, codes = __edge_row__(
+                i,
+                k,
+                m,
+                previous,
+                up,
+                profile[s[i - 1]],
+                insertion,
+                insertion_prefix,
+                first_column[i],
+                outside,
+                optimum,
+                scan,
+            )
+
+        D[i] = row
+        B[i] = codes
+
+    return D, B
+
+
+def __edge_row__(
+    i: int,
+    k: int,
+    m: int,
+    previous: np.ndarray,
+    up: np.ndarray,
+    scores: np.ndarray,
+    insertion: np.ndarray,
+    insertion_prefix: np.ndarray,
+    first: int,
+    outside: int,
+    optimum,
+    scan,
+):
+    """
+    Computes a band row that crosses the first or the last column of the matrix.
+    """
+    j = np.arange(i - k, i + k + 1)
+    inside = (j >= 0) & (j <= m)
+    columns = np.clip(j, 0, m)
+
+    diagonal = previous + scores[columns]
+    diagonal[j < 1] = outside
+
+    best = optimum(up, diagonal)
+    best[~inside] = outside
+
+    if i <= k:
+        # Column 0 is part of the band
+        best[k - i] = first
+
+    G = insertion_prefix[columns]
+    row = G + scan(best - G)
+    row[~inside] = outside
+
+    left = np.full(2 * k + 1, outside, dtype=int)
+    left[1:] = row[:-1] + insertion[columns[1:]]
+    left[j < 1] = outside
+
+    codes = np.where(row == left, LEFT, np.where(row == diagonal, DIAG, UP)).astype(
+        np.uint8
+    )
+    codes[~inside] = NONE
+
+    if i <= k:
+        codes[k - i] = UP
+
+    return row, codes
+
+
+def banded_end(D: np.ndarray, k: int, is_similarity: bool) -> int:
+    """
+    Returns the column of the best cell of the last row of a banded matrix, the
+    leftmost one among ties.
+    """
+    n = len(D) - 1
+    row = D[n]
+
+    return int(row.argmax() if is_similarity else row.argmin()) + n - k
+
+
+def banded_backtracking(
+    D: np.ndarray,
+    B: np.ndarray,
+    s: np.ndarray,
+    t: np.ndarray,
+    k: int,
+    end: int | None = None,
+) -> EditScript:
+    """
+    Follows the direction codes of a banded matrix from the last cell, or from
+    column end of the last row, and returns the edit script of the encoded
+    sequences. With a free first row, the script starts where the path reaches
+    it.
+    """
+    n, m = len(s), len(t)
+    t_end = m if end is None else end
+    i, j = n, t_end
+    edits = EditScriptBuilder()
+
+    while True:
+        direction = B.item(i, j - i + k)
+
+        if direction == NONE:
+            break
+
+        if direction == LEFT:
+            edits.add(DELETION)
+            j -= 1
+        elif direction == UP:
+            edits.add(INSERTION)
+            i -= 1
+        else:
+            edits.add(MATCH if s[i - 1] == t[j - 1] else MISMATCH)
+            i -= 1
+            j -= 1
+
+    return edits.build(0, n, j, t_end, D.item(n, t_end - n + k))
+
+
+def is_band_optimal(
+    score: int,
+    s: np.ndarray,
+    t: np.ndarray,
+    scoring: ScoringScheme,
+    is_similarity: bool,
+    k: int,
+):
+    """
+    Checks whether no path leaving the band can beat the banded score.
+
+    A path that leaves the band touches diagonal k + 1 or -(k + 1) and still has
+    to end on diagonal m - n, so it contains at least 2(k + 1) - |m - n| gaps.
+    """
+    n = len(s)
+    m = len(t)
+
+    if k >= max(n, m):
+        return True
+
+    gaps = np.concatenate([scoring.deletion[s], scoring.insertion[t]])
+    min_gaps = 2 * (k + 1) - abs(m - n)
+
+    if not is_similarity:
+        # All weights are non-negative, so the gaps alone give a lower bound
+        return score <= int(gaps.min()) * min_gaps
+
+    # With g gaps, the path has (n + m - g) / 2 substitutions. The bound is linear
+    # in g, so its maximum is reached at one of the extremes.
+    substitutions = scoring.substitution[np.ix_(np.unique(s), np.unique(t))]
+    max_substitution = int(substitutions.max())
+    max_gap = int(gaps.max())
+
+    bound = max(
+        max_substitution * (n + m - g) / 2 + max_gap * g for g in (min_gaps, n + m)
+    )
+
+    return score >= bound
+
+
+def banded_alignment(
+    s: str,
+    t: str,
+    scoring: ScoringScheme,
+    is_similarity: bool,
+    k: int,
+    widen: bool = False,
+):
+    """
+    Computes a global alignment restricted to a band of width k around the diagonal.
+    With widen, the band is doubled until the score is proven to be optimal.
+    Returns the compact matrices, the final band width and whether it is optimal.
+    """
+    s_codes = scoring.encode(s)
+    t_codes = scoring.encode(t)
+
+    k = max(k, abs(len(s) - len(t)))
+
+    while True:
+        D, B = banded_fill(s_codes, t_codes, scoring, is_similarity, k)
+        score = D.item(len(s), len(t) - len(s) + k)
+        optimal = is_band_optimal(score, s_codes, t_codes, scoring, is_similarity, k)
+
+        if optimal or not widen:
+            break
+
+        k = min(max(2 * k, 1), max(len(s), len(t)))
+
+    return D, B, k, optimal
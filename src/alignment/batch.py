@@ -0,0 +1,226 @@
+import itertools
+import json
+from collections import deque
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, Iterable, Iterator, List, TextIO, Tuple
+from scoring import ScoringScheme
+from worker_pool import with_state, worker_pool
+
+# Pair of sequences to align: a name, the query s and the target t
+Pair = Tuple[str, str, str]
+
+
+@dataclass
+class PairResult:
+    name: str
+    score: int
+    cigar: str | None = None
+    s_start: int | None = None
+    s_end: int | None = None
+    t_start: int | None = None
+    t_end: int | None = None
+    identity: float | None = None
+
+
+def read_fasta(file: TextIO) -> Iterator[Tuple[str, str]]:
+    """
+    Streams the (name, sequence) records of a FASTA file.
+    """
+    name = None
+    lines: List[str] = []
+
+    for line in file:
+        line = line.strip()
+
+        if line.startswith(">"):
+            if name is not None:
+                yield name, "".join(lines)
+            name = line[1:].split()[0] if len(line) > 1 else ""
+            lines = []
+        elif line:
+            if name is None:
+                raise ValueError("FASTA input must start with a header line")
+            lines.append(line)
+
+    if name is not None:
+        yield name, "".join(lines)
+
+
+def read_fasta_pairs(file: TextIO) -> Iterator[Pair]:
+    """
+    Reads consecutive FASTA records as (query, target) pairs. The pair is named
+    after the header of the query.
+    """
+    records = read_fasta(file)
+
+    for name, s in records:
+        target = next(records, None)
+
+        if target is None:
+            raise ValueError(f"Record {name!r} has no target to be aligned with")
+
+        yield name, s, target[1]
+
+
+def read_tsv_pairs(file: TextIO) -> Iterator[Pair]:
+    """
+    Reads pairs from lines with the columns name, query and target, or only query
+    and target, in which case the pair is named after its line number.
+    """
+    for number, line in enumerate(file, 1):
+        line = line.rstrip("\n")
+
+        if not line or line.startswith("#"):
+            continue
+
+        columns = line.split("\t")
+
+        if len(columns) == 2:
+            yield str(number), columns[0], columns[1]
+        elif len(columns) == 3:
+            yield columns[0], columns[1], columns[2]
+        else:
+            raise ValueError(f"Line {number} must have two or three columns")
+
+
+def read_pairs(file: TextIO, format: str | None = None) -> Iterator[Pair]:
+    """
+    Streams pairs from FASTA or TSV input. Without a format, FASTA is assumed if
+    the first character is '>'.
+    """
+    if format is None:
+        first = file.read(1)
+        format = "fasta" if first == ">" else "tsv"
+        file = itertools.chain([first + file.readline()], file)
+
+    if format == "fasta":
+        return read_fasta_pairs(file)
+    if format == "tsv":
+        return read_tsv_pairs(file)
+
+    raise ValueError(f"Unknown input format {format!r}")
+
+
+def __align_pair__(state: Dict, name: str, s: str, t: str) -> PairResult:
+    alignment = state["aligner"](
+        s,
+        t,
+        state["scoring"],
+        state["is_similarity"],
+        **state["options"],
+    )
+    script = alignment.edit_script
+
+    if script is None:
+        return PairResult(name, int(alignment.score))
+
+    return PairResult(
+        name,
+        int(alignment.score),
+        script.cigar(),
+        script.s_start,
+        script.s_end,
+        script.t_start,
+        script.t_end,
+        script.identity,
+    )
+
+
+def __align_chunk__(state: Dict, chunk: List[Pair]) -> List[PairResult]:
+    return [__align_pair__(state, *pair) for pair in chunk]
+
+
+def __chunks__(pairs: Iterable[Pair], size: int) -> Iterator[List[Pair]]:
+    chunk: List[Pair] = []
+
+    for pair in pairs:
+        chunk.append(pair)
+
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def align_many(
+    pairs: Iterable[Pair],
+    w: Dict[str, Dict[str, int]] | ScoringScheme,
+    aligner=None,
+    is_similarity: bool = False,
+    workers: int | None = None,
+    chunk_size: int = 64,
+    max_pending: int | None = None,
+    **options,
+) -> Iterator[PairResult]:
+    """
+    Aligns a stream of (name, s, t) pairs and yields the results in input order.
+
+    :param aligner: aligner class, NeedlemanWunsch by default
+    :param workers: number of worker processes, the pairs are aligned in this
+        process if None or 1
+    :param chunk_size: number of pairs sent to a worker at once
+    :param max_pending: maximum number of chunks in flight, 2 per worker by
+        default. Bounds the memory when the input is read faster than aligned.
+    :param options: further keyword arguments of the aligner, such as score_only
+
+    The scoring scheme is converted once and sent to every worker when the pool
+    starts, not with every chunk.
+    """
+    if aligner is None:
+        from alignment_algorithms import NeedlemanWunsch
+
+        aligner = NeedlemanWunsch
+
+    scoring = w if isinstance(w, ScoringScheme) else ScoringScheme.from_weight_matrix(w)
+    # Aligner and its settings, sent to every worker process once
+    state = dict(
+        aligner=aligner, scoring=scoring, is_similarity=is_similarity, options=options
+    )
+
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be positive")
+
+    if workers is None or workers <= 1:
+        for chunk in __chunks__(pairs, chunk_size):
+            yield from __align_chunk__(state, chunk)
+
+        return
+
+    if max_pending is None:
+        max_pending = 2 * workers
+
+    with worker_pool(workers, state) as executor:
+        pending = deque()
+
+        for chunk in __chunks__(pairs, chunk_size):
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+
+            pending.append(executor.submit(with_state, __align_chunk__, chunk))
+
+        while pending:
+            yield from pending.popleft().result()
+
+
+def write_results(results: Iterable[PairResult], file: TextIO, format: str = "jsonl"):
+    """
+    Writes results as JSON lines or as TSV with a header, one line per result as
+    soon as it is available.
+    """
+    if format == "jsonl":
+        for result in results:
+            file.write(json.dumps(asdict(result)) + "\n")
+    elif format == "tsv":
+        names = [field.name for field in fields(PairResult)]
+        file.write("\t".join(names) + "\n")
+
+        for result in results:
+            values = (getattr(result, name) for name in names)
+            file.write(
+                "\t".join("" if value is None else str(value) for value in values)
+                + "\n"
+            )
+    else:
+        raise ValueError(f"Unknown output format {format!r}")
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+import random
+import timeit
+from alignment_algorithms import NeedlemanWunsch, ScoringScheme, SmithWaterman
+from four_russians import block_size, block_tables, four_russians
+from general_alignment import Alignment, alignment_score, build_weight_matrix
+from kernels import last_row
+from myers import myers
+from striped import StripedSmithWaterman
+
+
+def random_pair(length: int, mutation_rate: float = 0.1):
+    """
+    Generates a random DNA sequence and a mutated copy of it.
+    """
+    s = "".join(random.choices("ACGT", k=length))
+    t = "".join(
+        random.choice("ACGT") if random.random() < mutation_rate else c for c in s
+    )
+    return s, t
+
+
+def benchmark_fill(lengths, repeat: int):
+    """
+    Compares the cell-by-cell fill with the vectorized fill.
+    """
+    w = build_weight_matrix("ACGT", 0, 2, 3)
+
+    print("length\tnaive [s]\tvectorized [s]\tspeedup")
+
+    for length in lengths:
+        s, t = random_pair(length)
+        alignment = NeedlemanWunsch("", "", w)
+        s_codes, t_codes = alignment.scoring.encode(s), alignment.scoring.encode(t)
+
+        naive = min(
+            timeit.repeat(
+                lambda: alignment.__generate_matrix_naive__(s, t),
+                number=1,
+                repeat=repeat,
+            )
+        )
+        vectorized = min(
+            timeit.repeat(
+                lambda: alignment.__generate_matrix__(s_codes, t_codes),
+                number=1,
+                repeat=repeat,
+            )
+        )
+
+        print(f"{length}\t{naive:.4f}\t{vectorized:.4f}\t{naive / vectorized:.1f}x")
+
+
+def benchmark_search(length: int, targets: int, repeat: int):
+    """
+    Compares a database search with SmithWaterman and with the striped engine.
+    """
+    scoring = ScoringScheme.build("ACGT", 3, -2, -3)
+    query = random_pair(length)[0]
+    database = [random_pair(length)[1] for _ in range(targets)]
+
+    print("targets\tSmithWaterman [s]\tstriped [s]\tspeedup")
+
+    full = min(
+        timeit.repeat(
+            lambda: [SmithWaterman(query, t, scoring, True) for t in database],
+            number=1,
+            repeat=repeat,
+        )
+    )
+    striped = min(
+        timeit.repeat(
+            lambda: StripedSmithWaterman(query, scoring).scores(database),
+            number=1,
+            repeat=repeat,
+        )
+    )
+
+    print(f"{targets}\t{full:.4f}\t{striped:.4f}\t{full / striped:.1f}x")
+
+
+def benchmark_edit_distance(lengths, repeat: int, naive_limit: int):
+    """
+    Compares the unit-cost edit distance engines on long DNA: the cell-by-cell
+    fill (up to naive_limit), score rows, the Four Russians engine and Myers'
+    bit-vector algorithm. The Four Russians tables are built before timing.
+    """
+    scoring = ScoringScheme.build("ACGT", 0, 1, 1)
+    block_tables(4, block_size(4))
+
+    print("length\tnaive [s]\trows [s]\tfour russians [s]\tmyers [s]")
+
+    for length in lengths:
+        s_text, t_text = random_pair(length)
+        s, t = scoring.encode(s_text), scoring.encode(t_text)
+        alignment = NeedlemanWunsch("", "", scoring)
+
+        def best(function):
+            return min(timeit.repeat(function, number=1, repeat=repeat))
+
+        naive = (
+            f"{best(lambda: alignment.__generate_matrix_naive__(s_text, t_text)):.4f}"
+            if length <= naive_limit
+            else "-"
+        )
+        rows = best(lambda: last_row(s, t, scoring, False))
+        russians = best(lambda: four_russians(s, t, scoring))
+        bits = best(lambda: myers(s, t))
+
+        print(f"{length}\t{naive}\t{rows:.4f}\t{russians:.4f}\t{bits:.4f}")
+
+
+def benchmark_threads(length: int, threads, tile_size: int, repeat: int):
+    """
+    Measures the scaling of the threaded backend on one long pair from 1 to N
+    threads, against the single-threaded score rows.
+    """
+    scoring = ScoringScheme.build("ACGT", 0, 2, 3)
+    s, t = random_pair(length)
+
+    def best(backend, workers=None):
+        return min(
+            timeit.repeat(
+                lambda: alignment_score(
+                    s,
+                    t,
+                    scoring,
+                    backend=backend,
+                    workers=workers,
+                    tile_size=tile_size,
+                ),
+                number=1,
+                repeat=repeat,
+            )
+        )
+
+    rows = best(Alignment.Backend.ROWS)
+    print(f"length {length}, tile size {tile_size}, rows {rows:.4f} s")
+    print("threads\tthreaded [s]\tspeedup over 1 thread\tspeedup over rows")
+
+    single = None
+
+    for workers in threads:
+        threaded = best(Alignment.Backend.THREADED, workers)
+        single = single or threaded
+
+        print(
+            f"{workers}\t{threaded:.4f}\t{single / threaded:.1f}x\t{rows / threaded:.1f}x"
+        )
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Alignment benchmarks")
+    parser.add_argument(
+        "--lengths",
+        type=int,
+        nargs="+",
+        default=[100, 200, 400, 800],
+        help="Sequence lengths",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per run")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--targets", type=int, default=200, help="Number of targets for the search"
+    )
+    parser.add_argument(
+        "--distance-lengths",
+        type=int,
+        nargs="+",
+        default=[1000, 4000, 16000],
+        help="Sequence lengths for the edit distance engines",
+    )
+    parser.add_argument(
+        "--naive-limit",
+        type=int,
+        default=1000,
+        help="Longest sequences for the cell-by-cell edit distance",
+    )
+
+    parser.add_argument(
+        "--threaded-length",
+        type=int,
+        default=20000,
+        help="Sequence length for the threaded backend",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8],
+        help="Thread counts for the threaded backend",
+    )
+    parser.add_argument(
+        "--tile-size", type=int, default=4096, help="Tile size of the threaded backend"
+    )
+
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    benchmark_fill(args.lengths, args.repeat)
+    benchmark_search(args.lengths[0], args.targets, args.repeat)
+    benchmark_edit_distance(args.distance_lengths, args.repeat, args.naive_limit)
+    benchmark_threads(args.threaded_length, args.threads, args.tile_size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import math
+import numpy as np
+import tempfile
+from kernels import LEFT, NONE, UP, __directions__, __next_row__
+from scoring import ScoringScheme
+
+
+class CheckpointedScores:
+    """
+    Score matrix of which only every interval-th row is kept, in a memory-mapped
+    file. The other rows are recomputed from the closest checkpoint above them,
+    one block of interval rows at a time. The last recomputed block is cached,
+    so walking the rows upwards (as the traceback does) recomputes every block
+    at most once.
+
+    Supports the parts of the ndarray interface used by the alignment classes:
+    shape, rows, single cells, item, max and argmax.
+    """
+
+    def __init__(
+        self,
+        checkpoints: np.ndarray,
+        interval: int,
+        s: np.ndarray,
+        t: np.ndarray,
+        scoring: ScoringScheme,
+        is_similarity: bool,
+        local: bool,
+        free_column: bool,
+        maximum: int,
+        argmax: int,
+    ) -> None:
+        self.checkpoints = checkpoints
+        self.interval = interval
+        self.shape = (len(s) + 1, len(t) + 1)
+        self.s = s
+        self.is_similarity = is_similarity
+        self.local = local
+        self.free_column = free_column
+        self.__maximum = maximum
+        self.__argmax = argmax
+
+        self.profile = scoring.substitution[:, t].astype(int)
+        self.deletion = scoring.deletion[s].astype(int)
+        self.insertion_prefix = np.zeros(len(t) + 1, dtype=int)
+        np.cumsum(scoring.insertion[t], out=self.insertion_prefix[1:])
+
+        self.__block_index = None
+        self.__block = None
+
+    def block(self, index: int) -> np.ndarray:
+        """
+        Returns the rows index * interval up to the next checkpoint (exclusive).
+        """
+        if index != self.__block_index:
+            start = index * self.interval
+            stop = min(start + self.interval, self.shape[0])
+
+            block = np.empty((stop - start, self.shape[1]), dtype=int)
+            block[0] = self.checkpoints[index]
+
+            for k in range(1, stop - start):
+                i = start + k
+                previous = block[k - 1]
+                first = previous[0]
+                if not self.free_column:
+                    first += self.deletion[i - 1]
+
+                block[k] = __next_row__(
+                    previous,
+                    first,
+                    self.profile[self.s[i - 1]],
+                    self.deletion[i - 1],
+                    self.insertion_prefix,
+                    self.is_similarity,
+                    self.local,
+                )[0]
+
+            self.__block_index = index
+            self.__block = block
+
+        return self.__block
+
+    def row(self, i: int) -> np.ndarray:
+        if i < 0:
+            i += self.shape[0]
+
+        if not 0 <= i < self.shape[0]:
+            raise IndexError(f"Row {i} is out of bounds")
+
+        return self.block(i // self.interval)[i % self.interval]
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            i, j = key
+            return self.row(i)[j]
+
+        return self.row(key)
+
+    def item(self, i: int, j: int) -> int:
+        return self.row(i).item(j)
+
+    def max(self) -> int:
+        return self.__maximum
+
+    def argmax(self) -> int:
+        return self.__argmax
+
+
+def fill_checkpointed(
+    s: np.ndarray,
+    t: np.ndarray,
+    scoring: ScoringScheme,
+    is_similarity: bool,
+    local: bool,
+    free_row: bool,
+    free_column: bool,
+    directory: str | None = None,
+    interval: int | None = None,
+):
+    """
+    Fills the score matrix and the direction codes like fill_matrices, but backs
+    both by memory-mapped files in directory (the system default if None), so the
+    matrices may exceed the main memory.
+
+    The direction codes are stored in full. Of the score matrix, only every
+    interval-th row is stored (by default about sqrt(len(s)) rows apart), the
+    returned CheckpointedScores recomputes the others on access. The files are
+    anonymous and disappear with the arrays.
+    """
+    n = len(s)
+    m = len(t)
+
+    if interval is None:
+        interval = math.isqrt(n) + 1
+
+    if interval < 1:
+        raise ValueError("Checkpoint interval must be positive")
+
+    profile = scoring.substitution[:, t].astype(int)
+    deletion = scoring.deletion[s].astype(int)
+    insertion = scoring.insertion[t].astype(int)
+
+    insertion_prefix = np.zeros(m + 1, dtype=int)
+    np.cumsum(insertion, out=insertion_prefix[1:])
+
+    B = np.memmap(
+        tempfile.TemporaryFile(dir=directory),
+        dtype=np.uint8,
+        mode="w+",
+        shape=(n + 1, m + 1),
+    )
+    checkpoints = np.memmap(
+        tempfile.TemporaryFile(dir=directory),
+        dtype=int,
+        mode="w+",
+        shape=(n // interval + 1, m + 1),
+    )
+
+    row = np.zeros(m + 1, dtype=int) if free_row else insertion_prefix.copy()
+    if not free_row:
+        B[0, 1:] = LEFT
+    checkpoints[0] = row
+
+    maximum = int(row.max())
+    argmax = int(row.argmax())
+
+    for i in range(1, n + 1):
+        first = row[0] if free_column else row[0] + deletion[i - 1]
+
+        row, up, diagonal, best = __next_row__(
+            row,
+            first,
+            profile[s[i - 1]],
+            deletion[i - 1],
+            insertion_prefix,
+            is_similarity,
+            local,
+        )
+        B[i, 0] = NONE if free_column else UP
+        B[i, 1:] = __directions__(
+            row, up, diagonal, best, insertion, is_similarity, local
+        )
+
+        if i % interval == 0:
+            checkpoints[i // interval] = row
+
+        # First maximum in row-major order, as D.argmax() of the full matrix
+        if row.max() > maximum:
+            maximum = int(row.max())
+            argmax = i * (m + 1) + int(row.argmax())
+
+    D = CheckpointedScores(
+        checkpoints,
+        interval,
+        s,
+        t,
+        scoring,
+        is_similarity,
+        local,
+        free_column,
+        maximum,
+        argmax,
+    )
+
+    return D, B
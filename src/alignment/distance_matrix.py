@@ -0,0 +1,125 @@
+import math
+import numpy as np
+from kernels import score_rows
+from scoring import ScoringScheme
+from typing import Dict, Sequence
+from worker_pool import with_state, worker_pool
+
+
+def bounded_distance(
+    s: np.ndarray, t: np.ndarray, scoring: ScoringScheme, threshold: int | None = None
+) -> float:
+    """
+    Computes the global distance of two encoded sequences, or inf as soon as it is
+    known to exceed the threshold.
+
+    Since all weights are non-negative, every path to the last cell crosses each
+    row at a score of at least the row minimum. The computation is abandoned at
+    the first row whose minimum exceeds the threshold. The length difference
+    gives a lower bound before the first row.
+    """
+    if threshold is not None:
+        gaps = scoring.deletion if len(s) > len(t) else scoring.insertion
+        cheapest = int(gaps.min()) if len(gaps) else 0
+
+        if abs(len(s) - len(t)) * cheapest > threshold:
+            return math.inf
+
+    for row in score_rows(s, t, scoring, False):
+        if threshold is not None and row.min() > threshold:
+            return math.inf
+
+    distance = int(row[-1])
+
+    return math.inf if threshold is not None and distance > threshold else distance
+
+
+def __tile__(state: Dict, rows: range, columns: range) -> np.ndarray:
+    """
+    Computes the distances of a tile of the upper triangle. Cells on or below the
+    main diagonal are left at 0. The state holds the encoded sequences, the
+    scoring scheme and the threshold.
+    """
+    sequences = state["sequences"]
+    tile = np.zeros((len(rows), len(columns)))
+
+    for a, i in enumerate(rows):
+        for b, j in enumerate(columns):
+            if i < j:
+                tile[a, b] = bounded_distance(
+                    sequences[i],
+                    sequences[j],
+                    state["scoring"],
+                    state["threshold"],
+                )
+
+    return tile
+
+
+def condensed_index(n: int, i, j):
+    """
+    Position of the pair i < j (or arrays of pairs) in a condensed distance matrix
+    of n sequences, in the layout of scipy.spatial.distance.squareform.
+    """
+    return n * i - i * (i + 1) // 2 + j - i - 1
+
+
+def pairwise_distances(
+    sequences: Sequence[str],
+    w: Dict[str, Dict[str, int]] | ScoringScheme,
+    threshold: int | None = None,
+    condensed: bool = False,
+    workers: int | None = None,
+    tile_size: int = 32,
+) -> np.ndarray:
+    """
+    Computes the global distances of all pairs of sequences.
+
+    Only the upper triangle is computed, split into tiles of tile_size x tile_size
+    pairs, which run on a process pool with more than one worker. With a
+    threshold, pairs farther apart are abandoned early and reported as inf.
+
+    Returns a dense symmetric matrix, or with condensed the upper triangle as a
+    flat array in the layout of scipy.spatial.distance.pdist.
+    """
+    scoring = w if isinstance(w, ScoringScheme) else ScoringScheme.from_weight_matrix(w)
+
+    if scoring.min_weight < 0:
+        raise ValueError("Weight matrix must be non-negative for distance computation")
+
+    if tile_size < 1:
+        raise ValueError("Tile size must be positive")
+
+    encoded = [scoring.encode(sequence) for sequence in sequences]
+    n = len(encoded)
+
+    tiles = [
+        (range(i, min(i + tile_size, n)), range(j, min(j + tile_size, n)))
+        for i in range(0, n, tile_size)
+        for j in range(i, n, tile_size)
+    ]
+
+    state = dict(sequences=encoded, scoring=scoring, threshold=threshold)
+
+    if workers is None or workers <= 1 or not tiles:
+        results = [__tile__(state, *tile) for tile in tiles]
+    else:
+        with worker_pool(workers, state) as executor:
+            results = list(
+                executor.map(with_state, [__tile__] * len(tiles), *zip(*tiles))
+            )
+
+    distances = np.zeros(n * (n - 1) // 2 if condensed else (n, n))
+
+    for (rows, columns), tile in zip(tiles, results):
+        i, j = np.meshgrid(rows, columns, indexing="ij")
+        upper = i < j
+        i, j, values = i[upper], j[upper], tile[upper]
+
+        if condensed:
+            distances[condensed_index(n, i, j)] = values
+        else:
+            distances[i, j] = values
+            distances[j, i] = values
+
+    return distances
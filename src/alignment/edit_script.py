@@ -0,0 +1,196 @@
+import numpy as np
+from scoring import ScoringScheme
+from typing import Iterable, List, Tuple
+
+# Edit operations, with s being the query and t the reference as in SAM
+MATCH = 0
+MISMATCH = 1
+INSERTION = 2  # character of s aligned to a gap
+DELETION = 3  # character of t aligned to a gap
+
+SYMBOLS = "=XID"
+
+
+class EditScript:
+    """
+    Run-length encoded alignment: an array of (operation, length) pairs together
+    with the aligned ranges s[s_start:s_end] and t[t_start:t_end].
+    """
+
+    def __init__(
+        self,
+        operations: np.ndarray | List[Tuple[int, int]],
+        s_start: int,
+        s_end: int,
+        t_start: int,
+        t_end: int,
+        score: int | None = None,
+    ) -> None:
+        self.operations = np.asarray(operations, dtype=np.uint32).reshape(-1, 2)
+        self.s_start = s_start
+        self.s_end = s_end
+        self.t_start = t_start
+        self.t_end = t_end
+        self.score = score
+
+    @classmethod
+    def join(cls, scripts: Iterable["EditScript"]) -> "EditScript":
+        """
+        Concatenates consecutive edit scripts, merging runs at the boundaries.
+        """
+        scripts = list(scripts)
+        runs: List[List[int]] = []
+
+        for script in scripts:
+            for op, length in script.operations.tolist():
+                if runs and runs[-1][0] == op:
+                    runs[-1][1] += length
+                else:
+                    runs.append([op, length])
+
+        return cls(
+            runs,
+            scripts[0].s_start,
+            scripts[-1].s_end,
+            scripts[0].t_start,
+            scripts[-1].t_end,
+        )
+
+    def reversed(self) -> "EditScript":
+        """
+        Returns the edit script of the alignment of the reversed sequences.
+        """
+        return EditScript(
+            self.operations[::-1],
+            self.s_start,
+            self.s_end,
+            self.t_start,
+            self.t_end,
+            self.score,
+        )
+
+    def shifted(self, s_offset: int, t_offset: int) -> "EditScript":
+        """
+        Returns the same edit script with coordinates moved by the given offsets.
+        """
+        return EditScript(
+            self.operations,
+            self.s_start + s_offset,
+            self.s_end + s_offset,
+            self.t_start + t_offset,
+            self.t_end + t_offset,
+            self.score,
+        )
+
+    def __len__(self) -> int:
+        return int(self.operations[:, 1].sum())
+
+    def count(self, op: int) -> int:
+        """
+        Counts the alignment columns with the given operation.
+        """
+        return int(self.operations[self.operations[:, 0] == op, 1].sum())
+
+    @property
+    def identity(self) -> float:
+        """
+        Fraction of alignment columns that are matches.
+        """
+        return self.count(MATCH) / len(self) if len(self) else 0.0
+
+    def cigar(self, extended: bool = True) -> str:
+        """
+        Formats the edit script as CIGAR string. Without extended, matches and
+        mismatches are merged into M.
+        """
+        runs: List[List] = []
+
+        for op, length in self.operations.tolist():
+            symbol = SYMBOLS[op] if extended or op > MISMATCH else "M"
+
+            if runs and runs[-1][0] == symbol:
+                runs[-1][1] += length
+            else:
+                runs.append([symbol, length])
+
+        return "".join(f"{length}{symbol}" for symbol, length in runs)
+
+    def aligned(self, s: str, t: str) -> Tuple[str, str]:
+        """
+        Materializes the gapped strings of the alignment.
+        """
+        s_aligned = []
+        t_aligned = []
+        i = self.s_start
+        j = self.t_start
+
+        for op, length in self.operations.tolist():
+            if op == INSERTION:
+                s_aligned.append(s[i : i + length])
+                t_aligned.append("-" * length)
+                i += length
+            elif op == DELETION:
+                s_aligned.append("-" * length)
+                t_aligned.append(t[j : j + length])
+                j += length
+            else:
+                s_aligned.append(s[i : i + length])
+                t_aligned.append(t[j : j + length])
+                i += length
+                j += length
+
+        return "".join(s_aligned), "".join(t_aligned)
+
+    def evaluate(self, s: np.ndarray, t: np.ndarray, scoring: ScoringScheme) -> int:
+        """
+        Computes the score of the edit script for encoded sequences.
+        """
+        score = 0
+        i = self.s_start
+        j = self.t_start
+
+        for op, length in self.operations.tolist():
+            if op == INSERTION:
+                score += int(scoring.deletion[s[i : i + length]].sum())
+                i += length
+            elif op == DELETION:
+                score += int(scoring.insertion[t[j : j + length]].sum())
+                j += length
+            else:
+                pairs = scoring.substitution[s[i : i + length], t[j : j + length]]
+                score += int(pairs.sum())
+                i += length
+                j += length
+
+        return score
+
+
+class EditScriptBuilder:
+    """
+    Collects the operations of a traceback, which runs from the end of the
+    alignment to its start, directly as runs.
+    """
+
+    def __init__(self) -> None:
+        self.runs: List[List[int]] = []
+
+    def add(self, op: int, length: int = 1) -> None:
+        if length == 0:
+            return
+
+        if self.runs and self.runs[-1][0] == op:
+            self.runs[-1][1] += length
+        else:
+            self.runs.append([op, length])
+
+    def add_script(self, script: EditScript) -> None:
+        """
+        Adds the runs of an edit script that precedes everything added so far.
+        """
+        for op, length in script.operations[::-1].tolist():
+            self.add(op, length)
+
+    def build(
+        self, s_start: int, s_end: int, t_start: int, t_end: int, score=None
+    ) -> EditScript:
+        return EditScript(self.runs[::-1], s_start, s_end, t_start, t_end, score)
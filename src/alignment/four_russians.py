@@ -0,0 +1,227 @@
+import numpy as np
+from functools import lru_cache
+from kernels import __next_row__
+from scoring import ScoringScheme
+
+# Largest number of entries of a block table
+MAX_TABLE_SIZE = 1 << 22
+
+# Number of table entries computed at once
+TABLE_CHUNK = 1 << 16
+
+
+def block_size(alphabet_size: int) -> int:
+    """
+    Largest block size whose table stays within MAX_TABLE_SIZE entries. A table
+    has an entry for every combination of the offsets along the top and left
+    border (3 values each) and of the characters of both sequences.
+    """
+    size = 1
+
+    while (9 * alphabet_size**2) ** (size + 1) <= MAX_TABLE_SIZE:
+        size += 1
+
+    return size
+
+
+def __digits__(codes: np.ndarray, base: int, count: int):
+    """
+    Splits numbers into their count least significant digits, the most
+    significant first.
+    """
+    digits = []
+
+    for _ in range(count):
+        codes, digit = np.divmod(codes, base)
+        digits.append(digit)
+
+    return digits[::-1]
+
+
+def __block_outputs__(keys: np.ndarray, alphabet_size: int, size: int):
+    """
+    Computes the blocks of the given keys (see block_tables) cell by cell, with
+    the digits and scores as int8. Returns the codes of the offsets along the
+    lower and right border.
+    """
+    offsets = 3**size
+    words = alphabet_size**size
+
+    keys, t_code = np.divmod(keys, words)
+    keys, s_code = np.divmod(keys, words)
+    top_code, left_code = np.divmod(keys, offsets)
+
+    top = [(digit - 1).astype(np.int8) for digit in __digits__(top_code, 3, size)]
+    left = [(digit - 1).astype(np.int8) for digit in __digits__(left_code, 3, size)]
+    s = [digit.astype(np.int8) for digit in __digits__(s_code, alphabet_size, size)]
+    t = [digit.astype(np.int8) for digit in __digits__(t_code, alphabet_size, size)]
+    del keys, t_code, s_code, top_code, left_code
+
+    # Scores relative to the upper left corner, only the last row is kept
+    previous = [np.zeros(len(top[0]), dtype=np.int8)]
+    for k in range(size):
+        previous.append(previous[-1] + top[k])
+
+    right = np.zeros(len(top[0]), dtype=np.uint16)
+
+    for i in range(size):
+        row = [previous[0] + left[i]]
+
+        for j in range(size):
+            cell = np.minimum(previous[j + 1], row[j]) + 1
+            np.minimum(cell, previous[j] + (s[i] != t[j]), out=cell)
+            row.append(cell)
+
+        right *= 3
+        right += (row[-1] - previous[-1] + 1).astype(np.uint16)
+        previous = row
+
+    bottom = np.zeros(len(top[0]), dtype=np.uint16)
+
+    for k in range(size):
+        bottom *= 3
+        bottom += (previous[k + 1] - previous[k] + 1).astype(np.uint16)
+
+    return bottom, right
+
+
+@lru_cache(maxsize=None)
+def block_tables(alphabet_size: int, size: int):
+    """
+    Computes the outputs of all unit-cost blocks of size x size cells.
+
+    An entry is addressed by the key ((top * 3^size + left) * a^size + s) * a^size
+    + t, with a the alphabet size. Here top and left are the offsets between
+    neighbouring cells along the upper and left border, shifted to 0, 1 and 2
+    and read as base-3 numbers, and s and t the characters of the block read as
+    base-a numbers. The tables hold the offsets along the lower and right border
+    in the same encoding.
+
+    The keys are computed in chunks of TABLE_CHUNK, so building the tables only
+    takes little memory besides the tables themselves. The tables only depend
+    on the alphabet size and the block size, so they are computed once per
+    process and shared by all alignments.
+    """
+    count = (3**size * alphabet_size**size) ** 2
+    bottom = np.empty(count, dtype=np.uint16)
+    right = np.empty(count, dtype=np.uint16)
+
+    for start in range(0, count, TABLE_CHUNK):
+        stop = min(start + TABLE_CHUNK, count)
+        keys = np.arange(start, stop, dtype=np.int64)
+        bottom[start:stop], right[start:stop] = __block_outputs__(
+            keys, alphabet_size, size
+        )
+
+    return bottom, right
+
+
+def __words__(codes: np.ndarray, alphabet_size: int, size: int) -> np.ndarray:
+    """
+    Reads the blocks of size characters of a sequence as base-a numbers.
+    """
+    blocks = codes[: len(codes) // size * size].reshape(-1, size).astype(np.int64)
+    weights = alphabet_size ** np.arange(size - 1, -1, -1, dtype=np.int64)
+
+    return blocks @ weights
+
+
+def __offsets__(codes: np.ndarray, size: int) -> np.ndarray:
+    """
+    Decodes offset codes of several blocks into one array of offsets.
+    """
+    digits = __digits__(codes.astype(np.int64), 3, size)
+
+    return np.stack(digits, axis=1).ravel() - 1
+
+
+def four_russians(
+    s: np.ndarray, t: np.ndarray, scoring: ScoringScheme, size: int | None = None
+) -> int:
+    """
+    Computes the unit-cost global edit distance with the Method of Four Russians
+    (Masek and Paterson, 1980) in O(len(s) * len(t) / size) table lookups.
+
+    The matrix is tiled into blocks of size x size cells. Neighbouring cells of a
+    unit-cost matrix differ by -1, 0 or 1, so the lower and right border of a
+    block only depend on the offsets along its upper and left border and on its
+    characters, which are looked up in precomputed tables. Blocks on the same
+    anti-diagonal of blocks are independent and looked up with one fancy index.
+
+    Rows and columns beyond the last full block are filled with score rows.
+    """
+    if not scoring.is_unit_cost():
+        raise ValueError("The Four Russians engine requires unit costs")
+
+    alphabet_size = len(scoring.alphabet)
+
+    if size is None:
+        size = block_size(alphabet_size)
+
+    bottom_table, right_table = block_tables(alphabet_size, size)
+
+    s = scoring.encode(s)
+    t = scoring.encode(t)
+    n = len(s)
+    m = len(t)
+
+    rows = n // size
+    columns = m // size
+    words = alphabet_size**size
+
+    s_words = __words__(s, alphabet_size, size)
+    t_words = __words__(t, alphabet_size, size)
+
+    # Offset codes along the borders, initially all +1 (gap costs)
+    increasing = 3**size - 1
+    bottom = np.full(columns, increasing, dtype=np.int64)
+    right = np.full(rows, increasing, dtype=np.int64)
+
+    for diagonal in range(rows + columns - 1):
+        i = np.arange(max(0, diagonal - columns + 1), min(diagonal, rows - 1) + 1)
+        j = diagonal - i
+
+        keys = (bottom[j] * 3**size + right[i]) * words
+        keys = (keys + s_words[i]) * words + t_words[j]
+
+        bottom[j] = bottom_table[keys]
+        right[i] = right_table[keys]
+
+    # Row rows * size up to column columns * size and the column on the right
+    last_row = np.zeros(columns * size + 1, dtype=int)
+    last_row[0] = rows * size
+    last_row[1:] = rows * size + np.cumsum(__offsets__(bottom, size))
+
+    last_column = np.arange(rows * size + 1)
+    if columns:
+        last_column[1:] = columns * size + np.cumsum(__offsets__(right, size))
+    last_column[0] = columns * size
+
+    prefix = np.arange(max(n, m) + 1)
+
+    # Remaining columns, computed as rows of the transposed matrix
+    for j in range(columns * size, m):
+        last_column = __next_row__(
+            last_column,
+            last_column[0] + 1,
+            (s[: rows * size] != t[j]).astype(int),
+            1,
+            prefix[: rows * size + 1],
+            False,
+            False,
+        )[0]
+        last_row = np.append(last_row, last_column[-1])
+
+    # Remaining rows
+    for i in range(rows * size, n):
+        last_row = __next_row__(
+            last_row,
+            last_row[0] + 1,
+            (t != s[i]).astype(int),
+            1,
+            prefix[: m + 1],
+            False,
+            False,
+        )[0]
+
+    return int(last_row[-1])
@@ -1,6 +1,29 @@
+import io
+import math
+import os
 import numpy as np
-from typing import Dict, Set
-from enum import Enum
+from typing import Dict, Set, TextIO, Tuple
+from enum import Enum, IntEnum
+import kernels
+from kernels import backtrack, fill_matrices, score_rows
+from myers import myers
+from four_russians import TABLE_CHUNK, block_size, four_russians
+from striped import StripedSmithWaterman
+from hirschberg import LEAF_SIZE, hirschberg
+from banded import banded_alignment, banded_backtracking
+from checkpointed import fill_checkpointed
+from wavefront import uniform_costs, wavefront_alignment
+from waterman_eggert import waterman_eggert
+from threaded import TILE_SIZE, fill_threaded
+from scoring import ScoringScheme
+
+# Bytes of array headers, Python frames and thread pools that every alignment
+# allocates regardless of the lengths of the sequences
+OVERHEAD = 1 << 16
+
+# Default free ends of semi-global alignments, in the order start of s, start of
+# t, end of s, end of t: s is fitted into t, whose flanks are free
+FITTING = (False, True, False, True)
 
 
 def build_weight_matrix(
@@ -20,54 +43,401 @@ def build_weight_matrix(
 
 
 class Alignment:
-    class Direction(Enum):
-        LEFT = 5
-        DIAG = 6
-        UP = 7
-        NONE = 8
+    class Direction(IntEnum):
+        """
+        Directions stored in the backtracking matrix B, which holds them as uint8 codes.
+        """
+
+        LEFT = kernels.LEFT
+        DIAG = kernels.DIAG
+        UP = kernels.UP
+        NONE = kernels.NONE
 
     class AlignmentType(Enum):
         GLOBAL = 0
         SEMI_GLOBAL = 1
         LOCAL = 2
 
+    class Strategy(Enum):
+        """
+        Ways of computing an alignment, from the fastest to the most frugal one.
+        """
+
+        WAVEFRONT = 0
+        BANDED = 1
+        FULL = 2
+        CHECKPOINTED = 3
+        HIRSCHBERG = 4
+        SCORE_ONLY = 5
+
+    class Backend(Enum):
+        """
+        Engines for score-only alignments. AUTO picks Myers' bit-vector algorithm
+        for unit-cost distances and score rows otherwise. STRIPED only pays off
+        when a query is searched against many targets and is used on request.
+        THREADED computes tiles of the matrix on a thread
+        pool and also fills the full matrices.
+        """
+
+        AUTO = 0
+        ROWS = 1
+        MYERS = 2
+        STRIPED = 3
+        FOUR_RUSSIANS = 4
+        THREADED = 5
+
     def __init__(
         self,
         s: str,
         t: str,
-        w: Dict[str, Dict[str, int]],
+        w: Dict[str, Dict[str, int]] | ScoringScheme,
         type: AlignmentType,
         is_similarity: bool,
         hirschberg: bool = False,
+        band: int | None = None,
+        widen_band: bool = False,
+        score_only: bool = False,
+        workers: int | None = None,
+        parallel_min_size: int = 1 << 20,
+        memory_budget: int | None = None,
+        scratch_directory: str | None = None,
+        checkpoint_interval: int | None = None,
+        wavefront: bool = False,
+        max_wavefront_score: int | None = None,
+        backend: Backend = Backend.AUTO,
+        tile_size: int = TILE_SIZE,
+        free_ends: Tuple[bool, bool, bool, bool] = FITTING,
     ) -> None:
         self.s = s
         self.t = t
         self.w = w
+        self.scoring = (
+            w if isinstance(w, ScoringScheme) else ScoringScheme.from_weight_matrix(w)
+        )
+        # Both sequences are encoded once, every strategy works on the codes
+        self.s_codes = self.scoring.encode(s)
+        self.t_codes = self.scoring.encode(t)
         self.type = type
         self.is_similarity = is_similarity
         self.hirschberg = hirschberg
+        self.band = band
+        self.widen_band = widen_band
+        self.band_optimal = None
+        self.score_only = score_only
+        self.workers = workers
+        self.parallel_min_size = parallel_min_size
+        self.scratch_directory = scratch_directory
+        self.checkpoint_interval = checkpoint_interval
+        self.max_wavefront_score = max_wavefront_score
+        self.backend = backend
+        self.tile_size = tile_size
+        # Free leading and trailing gaps of semi-global alignments, in the order
+        # start of s, start of t, end of s, end of t
+        self.free_ends = (
+            tuple(free_ends)
+            if type == Alignment.AlignmentType.SEMI_GLOBAL
+            else (False, False, False, False)
+        )
 
         if hirschberg and not type == Alignment.AlignmentType.GLOBAL:
             raise ValueError(
                 "Hirschberg algorithm has only been implemented for global alignment"
             )
 
-        if type == Alignment.AlignmentType.SEMI_GLOBAL:
-            raise UserWarning("Semi-global alignment has not been tested yet")
+        if band is not None and not type == Alignment.AlignmentType.GLOBAL:
+            raise ValueError(
+                "Banded alignment has only been implemented for global alignment"
+            )
+
+        if band is not None and hirschberg:
+            raise ValueError("Banded alignment cannot be combined with Hirschberg")
 
-        weights = [w[a][b] for a in w for b in w[a]]
-        min_weight = min(weights)
+        if score_only and (hirschberg or band is not None):
+            raise ValueError(
+                "Score-only alignment cannot be combined with Hirschberg or a band"
+            )
 
-        if not is_similarity and min_weight < 0:
+        if scratch_directory is not None and (
+            hirschberg or score_only or band is not None
+        ):
+            raise ValueError(
+                "On-disk matrices cannot be combined with Hirschberg, a band or "
+                "score-only alignment"
+            )
+
+        if memory_budget is not None and (hirschberg or score_only):
+            raise ValueError(
+                "Hirschberg and score-only alignment are chosen by the memory budget"
+            )
+
+        threaded = backend == Alignment.Backend.THREADED
+
+        if workers is not None and not (
+            hirschberg or memory_budget is not None or threaded
+        ):
+            raise ValueError(
+                "Parallel alignment is only available for Hirschberg and the "
+                "threaded backend"
+            )
+
+        if threaded and (
+            hirschberg or band is not None or scratch_directory is not None
+        ):
+            raise ValueError(
+                "The threaded backend cannot be combined with Hirschberg, a band "
+                "or on-disk matrices"
+            )
+
+        if wavefront and (
+            type != Alignment.AlignmentType.GLOBAL
+            or is_similarity
+            or score_only
+            or uniform_costs(self.scoring) is None
+        ):
+            raise ValueError(
+                "Wavefront alignment is only available for global distances with "
+                "free matches and uniform mismatch and gap costs"
+            )
+
+        if (
+            backend not in (Alignment.Backend.AUTO, Alignment.Backend.THREADED)
+            and memory_budget is None
+            and not score_only
+        ):
+            raise ValueError("Backends can only be chosen for score-only alignment")
+
+        if not is_similarity and self.scoring.min_weight < 0:
             raise ValueError(
                 "Weight matrix must be non-negative for distance computation"
             )
 
-        self.alignment = (
-            self.__align__(s, t) if not hirschberg else self.__align_hirschberg__(s, t)
+        if memory_budget is not None:
+            self.strategy = self.__select_strategy__(memory_budget)
+        elif score_only:
+            self.strategy = self.Strategy.SCORE_ONLY
+        elif hirschberg:
+            self.strategy = self.Strategy.HIRSCHBERG
+        elif band is not None:
+            self.strategy = self.Strategy.BANDED
+        elif scratch_directory is not None:
+            self.strategy = self.Strategy.CHECKPOINTED
+        else:
+            self.strategy = self.Strategy.FULL
+
+        self.estimated_memory, self.estimated_cells = self.__estimate__(self.strategy)
+
+        # The memory budget may replace the requested strategy
+        hirschberg = self.strategy == self.Strategy.HIRSCHBERG
+        score_only = self.strategy == self.Strategy.SCORE_ONLY
+        if self.strategy != self.Strategy.BANDED:
+            band = None
+        if self.strategy != self.Strategy.CHECKPOINTED:
+            self.scratch_directory = None
+
+        self.hirschberg = hirschberg
+        self.score_only = score_only
+        self.band = band
+
+        self.__alignment = None
+        s, t = self.s_codes, self.t_codes
+
+        script = self.__align_wavefront__(s, t) if wavefront else None
+
+        if script is not None:
+            self.strategy = self.Strategy.WAVEFRONT
+            self.estimated_memory, self.estimated_cells = self.__estimate__(
+                self.strategy
+            )
+            self.edit_script = script
+        elif score_only:
+            # Neither the backtracking matrix nor the edit script are computed
+            self.edit_script = None
+            self.score = alignment_score(
+                s,
+                t,
+                self.scoring,
+                type,
+                is_similarity,
+                self.backend,
+                workers,
+                tile_size,
+                self.free_ends,
+            )
+        elif hirschberg:
+            self.edit_script = self.__align_hirschberg__(s, t)
+        elif band is not None:
+            self.edit_script = self.__align_banded__(s, t, band, widen_band)
+        else:
+            self.edit_script = self.__align__(s, t)
+
+        if self.edit_script is not None:
+            self.score = self.edit_script.score
+
+    def __estimate__(self, strategy: "Alignment.Strategy"):
+        """
+        Estimates the peak memory in bytes and the number of computed cells of a
+        strategy, as an upper bound. Scores are int64 and directions uint8.
+        Every strategy counts the substitution profile of t and the gap costs
+        (int32 lookups copied to int64), the temporaries of the row kernels and
+        Python objects of the edit scripts and lists with a flat size each, on
+        top of a fixed OVERHEAD.
+        """
+        n = len(self.s)
+        m = len(self.t)
+        row = 8 * (m + 1)
+        profile = 12 * len(self.scoring.alphabet) * (m + 1)
+        gaps = 12 * (n + m + 2)
+        runs = 80 * (n + m)
+        # The strings, their latin-1 bytes and the encoded codes
+        sequences = 3 * (n + m)
+
+        if strategy == self.Strategy.WAVEFRONT:
+            # Every wavefront is about 2 * score / gap diagonals wide
+            gap = uniform_costs(self.scoring)[1]
+            score = self.__wavefront_limit__()
+            cells = score * score // gap + n + m
+            memory = 8 * cells + 200 * score + runs
+        elif strategy == self.Strategy.FULL:
+            memory = 9 * (n + 1) * (m + 1) + profile + gaps + 8 * row + runs
+            cells = n * m
+
+            if self.backend == self.Backend.THREADED:
+                memory += self.__threaded_memory__()
+        elif strategy == self.Strategy.BANDED:
+            k = max(self.band, abs(n - m))
+            if self.widen_band:
+                # The band may be doubled up to the longer sequence
+                k = max(k, n, m)
+            width = 2 * k + 1
+            memory = 9 * (n + 1) * width + profile + gaps + 8 * row
+            memory += 64 * width + 8 * (n + 1) + runs
+            cells = n * width
+        elif strategy == self.Strategy.CHECKPOINTED:
+            # Only one block of recomputed rows is resident, the files are not
+            # counted. The traceback recomputes every block once.
+            interval = self.checkpoint_interval or math.isqrt(n) + 1
+            memory = (interval + 8) * row + profile + gaps + runs
+            cells = 2 * n * m
+        elif strategy == self.Strategy.HIRSCHBERG:
+            # The forward pass is kept during the reverse pass, a leaf is
+            # aligned with full matrices and the runs are collected once
+            leaf = min(LEAF_SIZE, (n + 1) * (m + 1))
+            memory = 10 * row + profile + gaps + 9 * leaf + runs
+            cells = 2 * n * m
+        else:
+            memory = self.__score_only_memory__()
+            cells = n * m
+
+        return memory + sequences + OVERHEAD, cells
+
+    def __threaded_memory__(self) -> int:
+        """
+        Memory of the tiles of the threaded backend that run at the same time,
+        and of the borders between the tiles.
+        """
+        n = len(self.s)
+        m = len(self.t)
+        tiles = max(1, -(-m // self.tile_size))
+        threads = min(self.workers or (os.cpu_count() or 1) + 4, tiles)
+        width = min(self.tile_size, m) + 1
+
+        return threads * (10 * 8 * width + 12 * width) + 16 * (n + m + 2)
+
+    def __score_only_memory__(self) -> int:
+        """
+        Memory of the engine that alignment_score picks for this alignment.
+        """
+        n = len(self.s)
+        m = len(self.t)
+        row = 8 * (m + 1)
+        profile = 12 * len(self.scoring.alphabet) * (m + 1)
+        gaps = 12 * (n + m + 2)
+        # Python integers of the last column, and of the last row if it is free
+        column = 44 * (n + 1)
+        if self.type == self.AlignmentType.SEMI_GLOBAL:
+            column += 44 * (m + 1)
+
+        backend = __resolve_backend__(
+            self.backend,
+            self.scoring,
+            self.type == self.AlignmentType.LOCAL,
+            self.is_similarity,
+        )
+
+        if backend == self.Backend.MYERS:
+            # Bit vectors of n bits and the characters of t as Python integers
+            return 32 * (n + m + 2) + 44 * (m + 1)
+
+        if backend == self.Backend.FOUR_RUSSIANS:
+            # Two uint16 tables, built in chunks of about 128 bytes per entry
+            alphabet_size = len(self.scoring.alphabet)
+            entries = (9 * alphabet_size**2) ** block_size(alphabet_size)
+            tables = 4 * entries + 128 * TABLE_CHUNK
+            return tables + 8 * row + 44 * (n + m + 2)
+
+        if backend == self.Backend.STRIPED:
+            # Striped profile of the query and the encoded target
+            return 128 * (n + 1) + 24 * (m + 1)
+
+        if backend == self.Backend.THREADED:
+            return profile + gaps + column + self.__threaded_memory__()
+
+        return profile + gaps + 8 * row + column
+
+    def __wavefront_limit__(self) -> int:
+        """
+        Score up to which the wavefront algorithm is used. Its work grows with the
+        square of the score, so by default it is bounded by a tenth of the
+        geometric mean of the lengths, where it takes about as long as the matrices.
+        """
+        if self.max_wavefront_score is not None:
+            return self.max_wavefront_score
+
+        return max(math.isqrt(len(self.s) * len(self.t)) // 10, 16)
+
+    def __align_wavefront__(self, s: np.ndarray, t: np.ndarray):
+        """
+        Tries the wavefront algorithm, returns None if the score exceeds the limit.
+        """
+        return wavefront_alignment(s, t, self.scoring, self.__wavefront_limit__())
+
+    def __select_strategy__(self, memory_budget: int) -> "Alignment.Strategy":
+        """
+        Picks the fastest strategy whose estimated memory fits into the budget.
+        Strategies that produce an alignment are preferred over score-only.
+        """
+        candidates = [self.Strategy.FULL]
+
+        if self.type == self.AlignmentType.GLOBAL and self.band is not None:
+            candidates.insert(0, self.Strategy.BANDED)
+
+        if self.scratch_directory is not None:
+            candidates.append(self.Strategy.CHECKPOINTED)
+
+        if self.type == self.AlignmentType.GLOBAL:
+            candidates.append(self.Strategy.HIRSCHBERG)
+
+        candidates.append(self.Strategy.SCORE_ONLY)
+
+        for strategy in candidates:
+            if self.__estimate__(strategy)[0] <= memory_budget:
+                return strategy
+
+        raise MemoryError(
+            f"No alignment strategy fits into a memory budget of {memory_budget} bytes"
         )
 
-    def __align__(self, s: str, t: str):
+    @property
+    def alignment(self):
+        """
+        The aligned strings, materialized from the edit script on first access.
+        """
+        if self.__alignment is None and self.edit_script is not None:
+            self.__alignment = self.edit_script.aligned(self.s, self.t)
+
+        return self.__alignment
+
+    def __align__(self, s: np.ndarray, t: np.ndarray):
         """
         Performs the alignment by computing the full score and backtracking matrices.
         """
@@ -78,89 +448,136 @@ class Alignment:
 
         return self.__backtracking__(D, B, s, t)
 
-    def __align_hirschberg__(self, s: str, t: str):
+    def __align_banded__(
+        self, s: np.ndarray, t: np.ndarray, band: int, widen_band: bool
+    ):
         """
-        Computes the alignment recursively using the Hirschberg algorithm.
-        Has only been tested for global alignment.
+        Performs a global alignment that only fills cells within band of the diagonal.
+        D and B are stored in the compact banded layout (see banded_fill).
         """
-        delim = len(s) // 2
+        D, B, band, optimal = banded_alignment(
+            s, t, self.scoring, self.is_similarity, band, widen_band
+        )
 
-        s1 = s[:delim]
-        t1 = t
-        D1, B1 = self.__generate_matrix__(s1, t1)
+        self.D = D
+        self.B = B
+        self.band = band
+        self.band_optimal = optimal
 
-        s2 = s[delim:][::-1]
-        t2 = t[::-1]
-        D2, B2 = self.__generate_matrix__(s2, t2)
+        return banded_backtracking(D, B, s, t, band)
 
-        summarized = D1[-1] + D2[-1][::-1]
-        min_index = summarized.argmax() if self.is_similarity else summarized.argmin()
+    def direction(self, i: int, j: int) -> "Alignment.Direction":
+        """
+        Returns the backtracking direction of cell (i, j) as an enum member.
+        """
+        return self.Direction(self.B.item(i, j))
+
+    def __align_hirschberg__(self, s: np.ndarray, t: np.ndarray):
+        """
+        Computes the alignment in linear space using the Hirschberg algorithm.
+        Has only been implemented for global alignment. With workers, the top
+        levels of the recursion run on a process pool.
+        """
+        return hirschberg(
+            s,
+            t,
+            self.scoring,
+            self.is_similarity,
+            self.workers,
+            self.parallel_min_size,
+        )
 
-        if len(s1) == 1:
-            end_index = min_index + 1
-            alignment1 = self.__backtracking__(
-                D1[:, :end_index], B1[:, :end_index], s1, t1[:end_index]
+    def __generate_matrix__(self, s: np.ndarray, t: np.ndarray):
+        """
+        Generates the score and backtracking matrices for the given encoded
+        sequences.
+        With a scratch directory, both are backed by files and only checkpoint
+        rows of the score matrix are stored.
+        """
+        free_row, free_column = self.__free_borders__()
+
+        if self.scratch_directory is not None:
+            return fill_checkpointed(
+                s,
+                t,
+                self.scoring,
+                self.is_similarity,
+                self.type == self.AlignmentType.LOCAL,
+                free_row,
+                free_column,
+                self.scratch_directory,
+                self.checkpoint_interval,
             )
-        else:
-            alignment1 = self.__align_hirschberg__(s[:delim], t[:min_index])
 
-        if len(s2) == 1:
-            end_index = len(t2) - min_index + 1
-            alignment2 = self.__backtracking__(
-                D2[:, :end_index], B2[:, :end_index], s2, t2[:end_index]
+        if self.backend == self.Backend.THREADED:
+            return fill_threaded(
+                s,
+                t,
+                self.scoring,
+                self.is_similarity,
+                self.type == self.AlignmentType.LOCAL,
+                free_row,
+                free_column,
+                self.workers,
+                self.tile_size,
             )
-            alignment2 = alignment2[0][::-1], alignment2[1][::-1]
-        else:
-            alignment2 = self.__align_hirschberg__(s[delim:], t[min_index:])
 
-        alignment = alignment1[0] + alignment2[0], alignment1[1] + alignment2[1]
+        return fill_matrices(
+            s,
+            t,
+            self.scoring,
+            self.is_similarity,
+            self.type == self.AlignmentType.LOCAL,
+            free_row,
+            free_column,
+        )
+
+    def __free_borders__(self):
+        """
+        Whether the first row and the first column of D are free (0) instead of
+        gap costs. Local alignments may start anywhere, semi-global ones at any
+        position of the sequences with a free start.
+        """
+        if self.type == self.AlignmentType.LOCAL:
+            return True, True
+
+        free_start_s, free_start_t = self.free_ends[:2]
 
-        return alignment
+        return free_start_t, free_start_s
 
-    def __generate_matrix__(self, s: str, t: str):
+    def __generate_matrix_naive__(self, s: str, t: str):
         """
-        Generates the score and backtracking matrices for the given strings.
+        Generates the score and backtracking matrices cell by cell.
+        Kept as a reference for the vectorized __generate_matrix__.
         """
+        w = self.scoring.to_weight_matrix()
+
         n = len(s)
         m = len(t)
 
         D = np.zeros((n + 1, m + 1), dtype=int)  # Distance matrix
-        B = np.zeros((n + 1, m + 1), dtype=self.Direction)  # Backtracking matrix
+        B = np.zeros((n + 1, m + 1), dtype=np.uint8)  # Backtracking matrix
 
         B[0, 0] = self.Direction.NONE
 
+        free_row, free_column = self.__free_borders__()
+
         # Initialize first row and column
         for i in range(1, n + 1):
-            D[i, 0] = (
-                D[i - 1, 0] + self.w[s[i - 1]]["-"]
-                if self.type == self.AlignmentType.GLOBAL
-                else 0
-            )
-            B[i, 0] = (
-                self.Direction.UP
-                if self.type == self.AlignmentType.GLOBAL
-                else self.Direction.NONE
-            )
+            D[i, 0] = 0 if free_column else D[i - 1, 0] + w[s[i - 1]]["-"]
+            B[i, 0] = self.Direction.NONE if free_column else self.Direction.UP
 
         for j in range(1, m + 1):
-            D[0, j] = (
-                D[0, j - 1] + self.w["-"][t[j - 1]]
-                if self.type == self.AlignmentType.GLOBAL
-                else 0
-            )
-            B[0, j] = (
-                self.Direction.LEFT
-                if self.type == self.AlignmentType.GLOBAL
-                else self.Direction.NONE
-            )
+            D[0, j] = 0 if free_row else D[0, j - 1] + w["-"][t[j - 1]]
+            B[0, j] = self.Direction.NONE if free_row else self.Direction.LEFT
 
         # Fill the matrices
         for i in range(1, n + 1):
             for j in range(1, m + 1):
                 # Compute scores
-                up_score = D[i - 1, j] + self.w[s[i - 1]]["-"]
-                left_score = D[i, j - 1] + self.w["-"][t[j - 1]]
-                diag_score = D[i - 1, j - 1] + self.w[s[i - 1]][t[j - 1]]
+                up_score = D[i - 1, j] + w[s[i - 1]]["-"]
+                left_score = D[i, j - 1] + w["-"][t[j - 1]]
+                diag_score = D[i - 1, j - 1] + w[s[i - 1]][t[j - 1]]
 
                 comparator = max if self.is_similarity else min
 
@@ -182,95 +599,270 @@ class Alignment:
         return D, B
 
     def __str__(self):
-        result = ""
+        output = io.StringIO()
+        self.render(output)
+        return output.getvalue()
 
-        if not self.hirschberg:
-            arrow_left = "\u2190"
-            arrow_up = "\u2191"
-            arrow_diag = "\u2196"
+    def render(self, file: TextIO):
+        """
+        Writes the matrices (if they were computed) and the alignment to a file-like
+        object. The matrix dump is written line by line, so it is never held in
+        memory as a whole.
+        """
+        if self.score_only:
+            file.write("Score:\n" + str(self.score) + "\n")
+            return
 
-            n = len(self.s)
-            m = len(self.t)
+        if self.strategy in (self.Strategy.FULL, self.Strategy.CHECKPOINTED):
+            tabsize = len(str(self.D.max())) + 1
 
-            sep = "\t"
+            file.write("Matrix:\n")
 
-            output = sep
+            for line in self.__matrix_lines__():
+                file.write(line.expandtabs(tabsize) + "\n")
 
-            for j in range(m):
-                output += sep + self.t[j] + sep
+            file.write("\n")
 
-            output += "\n"
+        file.write("Alignment:\n" + self.alignment[0] + "\n" + self.alignment[1] + "\n")
 
-            for i in range(2 * n + 1):
-                index_line = i // 2
-                if i % 2 == 0:
-                    output += sep
+    def __matrix_lines__(self):
+        """
+        Yields the lines of the matrix dump: every row of D with the left arrows,
+        followed by a line with the up and diagonal arrows into the next row.
+        """
+        arrow_left = "\u2190"
+        arrow_up = "\u2191"
+        arrow_diag = "\u2196"
 
-                    for j in range(m + 1):
-                        output += str(self.D[index_line, j]) + sep
+        n = len(self.s)
+        m = len(self.t)
 
-                        if j < m:
-                            output += (
-                                arrow_left
-                                if self.B[index_line, j + 1] == self.Direction.LEFT
-                                else ""
-                            ) + sep
-                else:
-                    output += self.s[index_line] + sep
-
-                    for j in range(m + 1):
-                        output += (
-                            arrow_up
-                            if index_line < n
-                            and self.B[index_line + 1, j] == self.Direction.UP
-                            else ""
-                        ) + sep
-                        output += (
-                            arrow_diag
-                            if index_line < n
-                            and j < m
-                            and self.B[index_line + 1, j + 1] == self.Direction.DIAG
-                            else ""
-                        ) + sep
-
-                output += "\n"
+        sep = "\t"
 
-            tabsize = len(str(self.D.max())) + 1
+        yield sep + "".join(sep + self.t[j] + sep for j in range(m))
 
-            result += "Matrix:\n" + output.expandtabs(tabsize) + "\n"
+        for index_line in range(n + 1):
+            scores = self.D[index_line].tolist()
+            directions = self.B[index_line].tolist()
 
-        result += "Alignment:\n" + self.alignment[0] + "\n" + self.alignment[1] + "\n"
-        return result
+            line = [sep]
+            for j in range(m + 1):
+                line.append(str(scores[j]) + sep)
 
-    def __backtracking__(self, D: np.ndarray, B: np.ndarray, s: str, t: str):
+                if j < m:
+                    left = directions[j + 1] == kernels.LEFT
+                    line.append((arrow_left if left else "") + sep)
+
+            yield "".join(line)
+
+            if index_line == n:
+                break
+
+            below = self.B[index_line + 1].tolist()
+
+            line = [self.s[index_line] + sep]
+            for j in range(m + 1):
+                up = below[j] == kernels.UP
+                diag = j < m and below[j + 1] == kernels.DIAG
+
+                line.append((arrow_up if up else "") + sep)
+                line.append((arrow_diag if diag else "") + sep)
+
+            yield "".join(line)
+
+    def top_alignments(self, k: int, min_score: int = 1):
+        """
+        Returns up to k local alignments as edit scripts, in decreasing order of
+        their score and without shared cells (Waterman-Eggert). The first one is
+        the alignment of this object. Only the regions affected by each reported
+        alignment are recomputed, on copies of D and B.
+        """
+        if (
+            self.type != self.AlignmentType.LOCAL
+            or not self.is_similarity
+            or self.strategy != self.Strategy.FULL
+        ):
+            raise ValueError(
+                "Top alignments require a local similarity with the full matrices"
+            )
+
+        return waterman_eggert(
+            self.D.copy(),
+            self.B.copy(),
+            self.s_codes,
+            self.t_codes,
+            self.scoring,
+            k,
+            min_score,
+        )
+
+    def __semi_global_end__(self, D: np.ndarray):
+        """
+        Returns the best cell of the last row (with a free end of t) and of the
+        last column (with a free end of s). Ties prefer the last cell, then the
+        last row from the left, then the last column from the top.
+        """
+        n, m = D.shape[0] - 1, D.shape[1] - 1
+        free_end_s, free_end_t = self.free_ends[2:]
+
+        cells = [(n, m)]
+        if free_end_t:
+            cells += [(n, j) for j in range(m)]
+        if free_end_s:
+            cells += [(i, m) for i in range(n)]
+
+        # The rows of checkpointed scores are recomputed in blocks, so the last
+        # column is read top to bottom
+        scores = [D.item(i, j) for i, j in cells]
+        best = max(scores) if self.is_similarity else min(scores)
+
+        return cells[scores.index(best)]
+
+    def __backtracking__(
+        self, D: np.ndarray, B: np.ndarray, s: np.ndarray, t: np.ndarray
+    ):
         """
-        Performs backtracking on the given matrices and returns the alignment.
+        Performs backtracking on the given matrices and returns the edit script.
         """
         if self.type == self.AlignmentType.LOCAL:
             i, j = np.unravel_index(D.argmax(), D.shape)
         elif self.type == self.AlignmentType.GLOBAL:
             i, j = D.shape[0] - 1, D.shape[1] - 1
         else:
-            raise ValueError("Invalid alignment type")
+            i, j = self.__semi_global_end__(D)
+
+        return backtrack(
+            D,
+            B,
+            s,
+            t,
+            int(i),
+            int(j),
+            self.type == self.AlignmentType.LOCAL,
+        )
+
+
+def __resolve_backend__(
+    backend: Alignment.Backend,
+    scoring: ScoringScheme,
+    local: bool,
+    is_similarity: bool,
+) -> Alignment.Backend:
+    """
+    Replaces AUTO by Myers' algorithm for unit-cost distances and by score rows
+    otherwise.
+    """
+    if backend != Alignment.Backend.AUTO:
+        return backend
+
+    if not is_similarity and not local and scoring.is_unit_cost():
+        return Alignment.Backend.MYERS
+
+    return Alignment.Backend.ROWS
+
+
+def alignment_score(
+    s: str | np.ndarray,
+    t: str | np.ndarray,
+    w: Dict[str, Dict[str, int]] | ScoringScheme,
+    type: Alignment.AlignmentType = Alignment.AlignmentType.GLOBAL,
+    is_similarity: bool = False,
+    backend: Alignment.Backend = Alignment.Backend.AUTO,
+    workers: int | None = None,
+    tile_size: int = TILE_SIZE,
+    free_ends: Tuple[bool, bool, bool, bool] = FITTING,
+) -> int:
+    """
+    Computes only the optimal score, without any backtracking information.
+
+    By default, unit-cost distances (build_weight_matrix(alphabet, 0, 1, 1)) are
+    computed with Myers' bit-vector algorithm and everything else with score-only
+    row passes. The backend selects an engine explicitly, the striped engine, the
+    Four Russians engine and the threaded engine (with workers threads and tiles
+    of tile_size) are only used on request. For a single pair, the striped engine
+    is slower than score rows, it is meant for StripedSmithWaterman.scores and
+    search over many targets.
+    Semi-global alignments leave the leading and trailing parts of the sequences
+    free as given by free_ends (start of s, start of t, end of s, end of t), by
+    default those of t.
+    """
+    scoring = w if isinstance(w, ScoringScheme) else ScoringScheme.from_weight_matrix(w)
+    s_codes = scoring.encode(s)
+    t_codes = scoring.encode(t)
+
+    local = type == Alignment.AlignmentType.LOCAL
+    free = type == Alignment.AlignmentType.SEMI_GLOBAL
+    free_start_s, free_start_t, free_end_s, free_end_t = (
+        free_ends if free else (False, False, False, False)
+    )
+    free_row = free_start_t or local
+    free_column = free_start_s or local
+    unit_distance = not is_similarity and not local and scoring.is_unit_cost()
+
+    backend = __resolve_backend__(backend, scoring, local, is_similarity)
+
+    if backend == Alignment.Backend.MYERS:
+        if not unit_distance:
+            raise ValueError("Myers' algorithm requires unit-cost distances")
+
+        return myers(
+            s_codes, t_codes, free_start_s, free_start_t, free_end_s, free_end_t
+        )
+
+    if backend == Alignment.Backend.FOUR_RUSSIANS:
+        if not unit_distance or any((free_row, free_column, free_end_s, free_end_t)):
+            raise ValueError(
+                "The Four Russians engine requires global unit-cost distances"
+            )
+
+        return four_russians(s_codes, t_codes, scoring)
+
+    if backend == Alignment.Backend.STRIPED:
+        if not (local and is_similarity):
+            raise ValueError("The striped engine requires local similarities")
+
+        return StripedSmithWaterman(s, scoring).score(t)[0]
 
-        s_aligned = ""
-        t_aligned = ""
+    optimum = max if is_similarity else min
 
-        while B[i, j] != Alignment.Direction.NONE and (
-            self.type == self.AlignmentType.GLOBAL or D[i, j] > 0
+    if backend == Alignment.Backend.THREADED:
+        row, column, best = fill_threaded(
+            s_codes,
+            t_codes,
+            scoring,
+            is_similarity,
+            local,
+            free_row,
+            free_column,
+            workers,
+            tile_size,
+            matrices=False,
+        )
+        column = column.tolist()
+    else:
+        best = 0
+        column = []
+
+        for row in score_rows(
+            s_codes,
+            t_codes,
+            scoring,
+            is_similarity,
+            local,
+            free_row,
+            free_column,
         ):
-            if B[i, j] == Alignment.Direction.LEFT:
-                s_aligned = "-" + s_aligned
-                t_aligned = t[j - 1] + t_aligned
-                j -= 1
-            elif B[i, j] == Alignment.Direction.UP:
-                s_aligned = s[i - 1] + s_aligned
-                t_aligned = "-" + t_aligned
-                i -= 1
-            else:
-                s_aligned = s[i - 1] + s_aligned
-                t_aligned = t[j - 1] + t_aligned
-                i -= 1
-                j -= 1
-
-        return s_aligned, t_aligned
+            best = max(best, int(row.max()))
+            column.append(int(row[-1]))
+
+    if local:
+        return best
+
+    score = int(row[-1])
+
+    if free_end_t:
+        score = optimum(score, optimum(row.tolist()))
+    if free_end_s:
+        score = optimum(score, optimum(column))
+
+    return score
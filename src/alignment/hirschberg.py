@@ -0,0 +1,250 @@
+import math
+import numpy as np
+from concurrent.futures import Executor, ProcessPoolExecutor
+from edit_script import EditScript, EditScriptBuilder
+from kernels import backtrack, fill_matrices, last_row
+from scoring import ScoringScheme
+from typing import List, Tuple
+
+# Largest subproblem in cells that is aligned with the full matrices
+LEAF_SIZE = 1 << 16
+
+
+def __is_leaf__(s: np.ndarray, t: np.ndarray, leaf_size: int) -> bool:
+    return len(s) <= 1 or (len(s) + 1) * (len(t) + 1) <= leaf_size
+
+
+def __align_base__(
+    s: np.ndarray,
+    t: np.ndarray,
+    scoring: ScoringScheme,
+    is_similarity: bool,
+    reverse: bool,
+) -> EditScript:
+    """
+    Aligns a subproblem of at most leaf_size cells (or a single character of s)
+    using the full matrices. With reverse, the reversed sequences are aligned.
+    """
+    if reverse:
+        s, t = s[::-1], t[::-1]
+
+    D, B = fill_matrices(s, t, scoring, is_similarity, False, False, False)
+    script = backtrack(D, B, s, t, len(s), len(t), False)
+
+    return script.reversed() if reverse else script
+
+
+def __split__(
+    s: np.ndarray,
+    t: np.ndarray,
+    scoring: ScoringScheme,
+    is_similarity: bool,
+):
+    """
+    Finds the column at which an optimal path crosses the middle row of s,
+    using one forward and one reverse score-only pass.
+    """
+    delim = len(s) // 2
+
+    forward = last_row(s[:delim], t, scoring, is_similarity)
+    reverse = last_row(s[delim:][::-1], t[::-1], scoring, is_similarity)
+
+    return delim, __crossing__(forward, reverse, is_similarity)
+
+
+def __crossing__(forward: np.ndarray, reverse: np.ndarray, is_similarity: bool):
+    """
+    Picks the column that optimizes the sum of the forward and reverse passes.
+    """
+    summarized = forward + reverse[::-1]
+    split = summarized.argmax() if is_similarity else summarized.argmin()
+
+    return int(split)
+
+
+def __hirschberg__(
+    s: np.ndarray,
+    t: np.ndarray,
+    scoring: ScoringScheme,
+    is_similarity: bool,
+    leaf_size: int,
+    edits: EditScriptBuilder,
+):
+    """
+    Adds the runs of an alignment of s and t to edits. The right half is solved
+    first, since the runs are collected from the end of the alignment to its
+    start. Halves of at most leaf_size cells are aligned with the full matrices,
+    the right one reversed.
+    """
+    delim, split = __split__(s, t, scoring, is_similarity)
+
+    for s_half, t_half, reverse in [
+        (s[delim:], t[split:], True),
+        (s[:delim], t[:split], False),
+    ]:
+        if __is_leaf__(s_half, t_half, leaf_size):
+            edits.add_script(
+                __align_base__(s_half, t_half, scoring, is_similarity, reverse)
+            )
+        else:
+            __hirschberg__(s_half, t_half, scoring, is_similarity, leaf_size, edits)
+
+
+def __solve__(
+    s: np.ndarray,
+    t: np.ndarray,
+    s_offset: int,
+    t_offset: int,
+    scoring: ScoringScheme,
+    is_similarity: bool,
+    reverse: bool,
+    leaf_size: int,
+) -> EditScript:
+    """
+    Solves one subproblem of the parallel recursion sequentially. Subproblems of
+    at most leaf_size cells are aligned like in __hirschberg__, where the right
+    half of a split is aligned reversed.
+    """
+    if __is_leaf__(s, t, leaf_size):
+        script = __align_base__(s, t, scoring, is_similarity, reverse)
+    else:
+        edits = EditScriptBuilder()
+        __hirschberg__(s, t, scoring, is_similarity, leaf_size, edits)
+        script = edits.build(0, len(s), 0, len(t))
+
+    return script.shifted(s_offset, t_offset)
+
+
+# Subproblem of the parallel recursion: s[s_start:s_end], t[t_start:t_end] and
+# whether it is the right half of its parent
+Subproblem = Tuple[int, int, int, int, bool]
+
+
+def __parallel_hirschberg__(
+    s: np.ndarray,
+    t: np.ndarray,
+    scoring: ScoringScheme,
+    is_similarity: bool,
+    executor: Executor,
+    levels: int,
+    min_size: int,
+    leaf_size: int,
+) -> List[EditScript]:
+    """
+    Splits the top levels of the recursion level by level. The forward and reverse
+    passes of all subproblems of a level are submitted to the executor at once,
+    the resulting subproblems are then solved by the workers.
+
+    Subproblems with less than min_size cells (len(s) * len(t)) are not split
+    any further, since the transfer to the workers would dominate.
+    """
+    problems: List[Subproblem] = [(0, len(s), 0, len(t), False)]
+
+    for _ in range(levels):
+        passes = {}
+
+        for index, (s_start, s_end, t_start, t_end, _) in enumerate(problems):
+            s_part, t_part = s[s_start:s_end], t[t_start:t_end]
+            if __is_leaf__(s_part, t_part, leaf_size) or (
+                len(s_part) * len(t_part) < min_size
+            ):
+                continue
+
+            delim = s_start + (s_end - s_start) // 2
+            passes[index] = (
+                delim,
+                executor.submit(
+                    last_row, s[s_start:delim], t[t_start:t_end], scoring, is_similarity
+                ),
+                executor.submit(
+                    last_row,
+                    s[delim:s_end][::-1],
+                    t[t_start:t_end][::-1],
+                    scoring,
+                    is_similarity,
+                ),
+            )
+
+        if not passes:
+            break
+
+        split_problems: List[Subproblem] = []
+
+        for index, problem in enumerate(problems):
+            if index not in passes:
+                split_problems.append(problem)
+                continue
+
+            s_start, s_end, t_start, t_end, _ = problem
+            delim, forward, reverse = passes[index]
+            split = t_start + __crossing__(
+                forward.result(), reverse.result(), is_similarity
+            )
+
+            split_problems.append((s_start, delim, t_start, split, False))
+            split_problems.append((delim, s_end, split, t_end, True))
+
+        problems = split_problems
+
+    futures = [
+        executor.submit(
+            __solve__,
+            s[s_start:s_end],
+            t[t_start:t_end],
+            s_start,
+            t_start,
+            scoring,
+            is_similarity,
+            reverse,
+            leaf_size,
+        )
+        for s_start, s_end, t_start, t_end, reverse in problems
+    ]
+
+    return [future.result() for future in futures]
+
+
+def hirschberg(
+    s: str | np.ndarray,
+    t: str | np.ndarray,
+    scoring: ScoringScheme,
+    is_similarity: bool,
+    workers: int | None = None,
+    min_size: int = 1 << 20,
+    leaf_size: int = LEAF_SIZE,
+) -> EditScript:
+    """
+    Computes an optimal global alignment in O(len(s) + len(t)) space.
+
+    The middle row of s is crossed at the column that optimizes the sum of a forward
+    and a reverse score-only pass, which splits the problem into two independent
+    halves. Subproblems of at most leaf_size cells are solved with backtracking
+    matrices, and the runs of the edit script are collected in one builder.
+
+    With more than one worker, the top levels of the recursion run on a process
+    pool: both passes of a split run concurrently, and the subproblems below are
+    distributed over the workers. The result is the same as the sequential one.
+    """
+    s = scoring.encode(s)
+    t = scoring.encode(t)
+
+    if __is_leaf__(s, t, leaf_size):
+        script = __align_base__(s, t, scoring, is_similarity, False)
+    elif workers is not None and workers > 1:
+        # Two subproblems per worker to balance unevenly sized halves
+        levels = math.ceil(math.log2(workers)) + 1
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pieces = __parallel_hirschberg__(
+                s, t, scoring, is_similarity, executor, levels, min_size, leaf_size
+            )
+
+        script = EditScript.join(pieces)
+    else:
+        edits = EditScriptBuilder()
+        __hirschberg__(s, t, scoring, is_similarity, leaf_size, edits)
+        script = edits.build(0, len(s), 0, len(t))
+
+    script.score = script.evaluate(s, t, scoring)
+
+    return script
@@ -0,0 +1,229 @@
+import numpy as np
+from edit_script import DELETION, INSERTION, MATCH, MISMATCH
+from edit_script import EditScript, EditScriptBuilder
+from scoring import ScoringScheme
+
+# Direction codes written into the backtracking matrix
+NONE = 0
+LEFT = 1
+DIAG = 2
+UP = 3
+
+
+def __next_row__(
+    previous: np.ndarray,
+    first: int,
+    diagonal_scores: np.ndarray,
+    deletion: int,
+    insertion_prefix: np.ndarray,
+    is_similarity: bool,
+    local: bool,
+):
+    """
+    Computes a full row of the score matrix from the previous row.
+
+    The up and diagonal candidates only depend on the previous row. The left
+    candidate depends on the current row, but since the gap costs along the row
+    are fixed, D[i, j] - G[j] (with G the prefix sums of the insertion costs) is
+    a running minimum (or maximum) and can be computed with a single accumulate.
+    """
+    up = previous[1:] + deletion
+    diagonal = previous[:-1] + diagonal_scores
+
+    if is_similarity:
+        best = np.maximum(up, diagonal)
+        scan = np.maximum.accumulate
+    else:
+        best = np.minimum(up, diagonal)
+        scan = np.minimum.accumulate
+
+    candidates = np.maximum(best, 0) if local else best
+
+    row = np.empty_like(previous)
+    row[0] = first
+    np.subtract(candidates, insertion_prefix[1:], out=row[1:])
+    scan(row, out=row)
+    row += insertion_prefix
+
+    return row, up, diagonal, best
+
+
+def __directions__(
+    row: np.ndarray,
+    up: np.ndarray,
+    diagonal: np.ndarray,
+    best: np.ndarray,
+    insertion: np.ndarray,
+    is_similarity: bool,
+    local: bool,
+):
+    """
+    Derives the direction codes of a row, preferring left over diagonal over up.
+    """
+    left = row[:-1] + insertion
+
+    if local:
+        # The clamping to 0 hides the unclamped optimum, so recompute it
+        score = np.maximum(best, left) if is_similarity else np.minimum(best, left)
+    else:
+        score = row[1:]
+
+    codes = np.where(score == left, LEFT, np.where(score == diagonal, DIAG, UP)).astype(
+        np.uint8
+    )
+
+    if local:
+        codes[score < 0] = NONE
+
+    return codes
+
+
+def fill_matrices(
+    s: np.ndarray,
+    t: np.ndarray,
+    scoring: ScoringScheme,
+    is_similarity: bool,
+    local: bool,
+    free_row: bool,
+    free_column: bool,
+):
+    """
+    Fills the score matrix and the direction codes one row at a time.
+
+    :param s: encoded first sequence (rows)
+    :param t: encoded second sequence (columns)
+    :param free_row: whether the first row is free (0) instead of gap costs
+    :param free_column: whether the first column is free (0) instead of gap costs
+    """
+    n = len(s)
+    m = len(t)
+
+    # Substitution scores of every alphabet character against t
+    profile = scoring.substitution[:, t].astype(int)
+    deletion = scoring.deletion[s].astype(int)
+    insertion = scoring.insertion[t].astype(int)
+
+    D = np.zeros((n + 1, m + 1), dtype=int)
+    B = np.zeros((n + 1, m + 1), dtype=np.uint8)
+
+    insertion_prefix = np.zeros(m + 1, dtype=int)
+    np.cumsum(insertion, out=insertion_prefix[1:])
+
+    if not free_row:
+        D[0] = insertion_prefix
+        B[0, 1:] = LEFT
+    if not free_column:
+        D[1:, 0] = np.cumsum(deletion)
+        B[1:, 0] = UP
+
+    for i in range(1, n + 1):
+        row, up, diagonal, best = __next_row__(
+            D[i - 1],
+            D[i, 0],
+            profile[s[i - 1]],
+            deletion[i - 1],
+            insertion_prefix,
+            is_similarity,
+            local,
+        )
+        D[i] = row
+        B[i, 1:] = __directions__(
+            row, up, diagonal, best, insertion, is_similarity, local
+        )
+
+    return D, B
+
+
+def score_rows(
+    s: np.ndarray,
+    t: np.ndarray,
+    scoring: ScoringScheme,
+    is_similarity: bool,
+    local: bool = False,
+    free_row: bool = False,
+    free_column: bool = False,
+):
+    """
+    Yields the rows of the score matrix one after another, keeping two rows at a
+    time. Uses O(len(t)) memory and never builds direction codes.
+    """
+    m = len(t)
+
+    profile = scoring.substitution[:, t].astype(int)
+    deletion = scoring.deletion[s].astype(int)
+    insertion = scoring.insertion[t].astype(int)
+
+    insertion_prefix = np.zeros(m + 1, dtype=int)
+    np.cumsum(insertion, out=insertion_prefix[1:])
+
+    row = np.zeros(m + 1, dtype=int) if free_row else insertion_prefix.copy()
+    yield row
+
+    for i in range(len(s)):
+        first = row[0] if free_column else row[0] + deletion[i]
+
+        row = __next_row__(
+            row,
+            first,
+            profile[s[i]],
+            deletion[i],
+            insertion_prefix,
+            is_similarity,
+            local,
+        )[0]
+        yield row
+
+
+def last_row(
+    s: np.ndarray,
+    t: np.ndarray,
+    scoring: ScoringScheme,
+    is_similarity: bool,
+    local: bool = False,
+    free_row: bool = False,
+    free_column: bool = False,
+):
+    """
+    Computes only the last row of the score matrix.
+    """
+    for row in score_rows(s, t, scoring, is_similarity, local, free_row, free_column):
+        pass
+
+    return row
+
+
+def backtrack(
+    D: np.ndarray,
+    B: np.ndarray,
+    s: np.ndarray,
+    t: np.ndarray,
+    i: int,
+    j: int,
+    local: bool,
+) -> EditScript:
+    """
+    Follows the direction codes from cell (i, j) of the encoded sequences and
+    returns the run-length encoded edit script. Local alignments stop at the first
+    cell with a non-positive score.
+    """
+    end_i, end_j = i, j
+    edits = EditScriptBuilder()
+
+    while True:
+        direction = B.item(i, j)
+
+        if direction == NONE or (local and D.item(i, j) <= 0):
+            break
+
+        if direction == LEFT:
+            edits.add(DELETION)
+            j -= 1
+        elif direction == UP:
+            edits.add(INSERTION)
+            i -= 1
+        else:
+            edits.add(MATCH if s[i - 1] == t[j - 1] else MISMATCH)
+            i -= 1
+            j -= 1
+
+    return edits.build(i, end_i, j, end_j, D.item(end_i, end_j))
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from banded import banded_backtracking, banded_end, banded_fill
+from dataclasses import dataclass
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+from scoring import UNKNOWN, ScoringScheme
+
+# Nucleotides with the IUPAC ambiguity codes, and their complements
+NUCLEOTIDES = "ACGTRYKMSWBDHVN"
+COMPLEMENT = str.maketrans(NUCLEOTIDES, "TGCAYRMKSWVHDBN")
+
+# Multiplier of the k-mer hash, an odd constant that spreads nearby k-mers
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+@dataclass
+class Mapping:
+    name: str
+    strand: str
+    contig: str
+    reference_start: int
+    reference_end: int
+    score: int
+    cigar: str
+    seeds: int
+
+
+def reverse_complement(sequence: str) -> str:
+    return sequence.translate(COMPLEMENT)[::-1]
+
+
+def kmer_codes(codes: np.ndarray, k: int, alphabet_size: int) -> np.ndarray:
+    """
+    Reads every k-mer of an encoded sequence as a base-a number, with k vector
+    operations over the whole sequence.
+    """
+    count = len(codes) - k + 1
+
+    if count <= 0:
+        return np.zeros(0, dtype=np.int64)
+
+    kmers = np.zeros(count, dtype=np.int64)
+
+    for offset in range(k):
+        kmers *= alphabet_size
+        kmers += codes[offset : offset + count]
+
+    return kmers
+
+
+def known_kmers(codes: np.ndarray, k: int) -> np.ndarray:
+    """
+    Marks the k-mers of an encoded sequence without characters outside of the
+    alphabet (encoded as UNKNOWN).
+    """
+    count = len(codes) - k + 1
+
+    if count <= 0:
+        return np.zeros(0, dtype=bool)
+
+    unknown = np.zeros(len(codes) + 1, dtype=np.int64)
+    np.cumsum(codes == UNKNOWN, out=unknown[1:])
+
+    return unknown[k:] == unknown[:count]
+
+
+def minimizers(kmers: np.ndarray, window: int | None) -> np.ndarray:
+    """
+    Returns the positions of the k-mers with the smallest hash in every window of
+    consecutive k-mers, or all positions without a window.
+    """
+    if window is None or window <= 1 or len(kmers) == 0:
+        return np.arange(len(kmers))
+
+    hashes = kmers.astype(np.uint64) * HASH_MULTIPLIER
+
+    if len(hashes) < window:
+        return np.array([int(hashes.argmin())])
+
+    windows = sliding_window_view(hashes, window)
+    positions = windows.argmin(axis=1) + np.arange(len(windows))
+
+    return np.unique(positions)
+
+
+class KmerIndex:
+    """
+    Sorted index of the k-mers (or minimizers) of a reference.
+
+    The k-mers are computed with whole-array operations and sorted once, so the
+    occurrences of a k-mer are a range of the sorted array that is found by
+    binary search, for many query k-mers at once. K-mers spanning one of the
+    boundaries (starts of further records in the reference) or containing
+    characters outside of the alphabet are not indexed.
+    """
+
+    def __init__(
+        self,
+        reference: str | np.ndarray,
+        scoring: ScoringScheme,
+        k: int = 15,
+        window: int | None = 10,
+        boundaries: Sequence[int] = (),
+    ) -> None:
+        self.alphabet_size = max(len(scoring.alphabet), 2)
+
+        if self.alphabet_size**k >= 2**62:
+            raise ValueError("k-mers must fit into 64 bit integers")
+
+        self.scoring = scoring
+        self.k = k
+        self.window = window
+
+        codes = scoring.encode(reference, strict=False)
+        kmers = kmer_codes(codes, k, self.alphabet_size)
+        positions = minimizers(kmers, window)
+        positions = positions[known_kmers(codes, k)[positions]]
+
+        # The k-mer at p spans a boundary b if p < b < p + k
+        ends = np.append(np.asarray(boundaries, dtype=np.int64), len(reference))
+        following = ends[np.searchsorted(ends, positions, "right")]
+        positions = positions[following >= positions + k]
+
+        order = np.argsort(kmers[positions], kind="stable")
+        self.keys = kmers[positions][order]
+        self.positions = positions[order]
+
+    def seeds(self, query: str, max_occurrences: int):
+        """
+        Returns the anchors (query position, reference position) of the k-mers of
+        the query found in the reference. K-mers occurring more than
+        max_occurrences times are repeats and skipped, like k-mers containing
+        characters outside of the alphabet.
+        """
+        codes = self.scoring.encode(query, strict=False)
+        kmers = kmer_codes(codes, self.k, self.alphabet_size)
+        query_positions = minimizers(kmers, self.window)
+        query_positions = query_positions[known_kmers(codes, self.k)[query_positions]]
+        keys = kmers[query_positions]
+
+        lo = np.searchsorted(self.keys, keys, "left")
+        hi = np.searchsorted(self.keys, keys, "right")
+        counts = hi - lo
+        counts[counts > max_occurrences] = 0
+
+        total = int(counts.sum())
+        starts = np.cumsum(counts) - counts
+
+        # Concatenation of the ranges lo[i]:hi[i]
+        indices = np.arange(total) - np.repeat(starts - lo, counts)
+
+        return np.repeat(query_positions, counts), self.positions[indices]
+
+
+def chain(
+    query_positions: np.ndarray,
+    reference_positions: np.ndarray,
+    k: int,
+    max_gap: int,
+    lookback: int = 50,
+) -> Tuple[int, List[Tuple[int, int]]]:
+    """
+    Finds the best chain of co-linear anchors with dynamic programming over the
+    anchors sorted by reference position.
+
+    An anchor extends a chain ending in one of the lookback anchors before it if
+    it lies after it in both sequences, by at most max_gap, and on a diagonal at
+    most max_gap away. It adds the bases it newly covers, minus the difference of
+    the two diagonals.
+    """
+    if len(query_positions) == 0:
+        return 0, []
+
+    order = np.lexsort((query_positions, reference_positions))
+    query = query_positions[order].tolist()
+    reference = reference_positions[order].tolist()
+
+    scores = [k] * len(query)
+    previous = [-1] * len(query)
+
+    for i in range(len(query)):
+        for j in range(max(0, i - lookback), i):
+            dq = query[i] - query[j]
+            dr = reference[i] - reference[j]
+
+            if dq <= 0 or dr <= 0 or dq > max_gap or dr > max_gap:
+                continue
+
+            shift = abs(dr - dq)
+
+            if shift > max_gap:
+                continue
+
+            score = scores[j] + min(dq, dr, k) - shift
+
+            if score > scores[i]:
+                scores[i] = score
+                previous[i] = j
+
+    end = int(np.argmax(scores))
+    anchors = []
+
+    i = end
+    while i >= 0:
+        anchors.append((query[i], reference[i]))
+        i = previous[i]
+
+    return scores[end], anchors[::-1]
+
+
+def __wildcard_scheme__(scoring: ScoringScheme) -> ScoringScheme:
+    """
+    Extends a distance scheme by a code for characters outside of the alphabet,
+    which costs the most expensive substitution against every character and the
+    most expensive gap.
+    """
+    size = len(scoring.alphabet)
+    substitution = np.full((size + 1, size + 1), scoring.max_weight, dtype=np.int32)
+    substitution[:size, :size] = scoring.substitution
+    deletion = np.append(scoring.deletion, scoring.deletion.max(initial=0))
+    insertion = np.append(scoring.insertion, scoring.insertion.max(initial=0))
+
+    return ScoringScheme(scoring.alphabet + [""], substitution, deletion, insertion)
+
+
+class ReadMapper:
+    """
+    Seed-and-extend mapper of reads against a reference, given as one sequence or
+    as (name, sequence) records.
+
+    The records are indexed once. For every read, the anchors of its minimizers
+    are chained, and the whole read is aligned against the reference window
+    spanned by the best chain, extended to the ends of the read and by band on
+    both sides, instead of a local alignment against the whole reference. The
+    alignment is banded to within band of the diagonals of the chain, and the
+    ends of the window are free, so indels before the first or after the last
+    anchor shift the mapped position. Reads over nucleotides, including
+    ambiguity codes such as N, are mapped on both strands. Characters outside of
+    the alphabet are not used as seeds and aligned as mismatches.
+    """
+
+    def __init__(
+        self,
+        reference: str | Iterable[Tuple[str, str]],
+        w: Dict[str, Dict[str, int]] | ScoringScheme,
+        k: int = 15,
+        window: int | None = 10,
+        max_occurrences: int = 64,
+        band: int = 16,
+    ) -> None:
+        records = [("", reference)] if isinstance(reference, str) else list(reference)
+        self.contigs = [name for name, _ in records]
+        self.reference = "".join(sequence for _, sequence in records)
+        # Start of every record in the joined reference, then the total length
+        self.offsets = np.cumsum([0] + [len(sequence) for _, sequence in records])
+        self.scoring = (
+            w if isinstance(w, ScoringScheme) else ScoringScheme.from_weight_matrix(w)
+        )
+        codes = self.scoring.encode(self.reference, strict=False)
+        self.index = KmerIndex(codes, self.scoring, k, window, self.offsets[1:-1])
+        self.alignment_scoring = __wildcard_scheme__(self.scoring)
+        self.codes = self.__alignment_codes__(codes)
+        self.max_occurrences = max_occurrences
+        self.band = band
+        self.both_strands = set(self.scoring.alphabet) <= set(NUCLEOTIDES)
+
+    def __alignment_codes__(self, codes: np.ndarray) -> np.ndarray:
+        """
+        Replaces UNKNOWN by the wildcard code of the alignment scheme.
+        """
+        wildcard = len(self.scoring.alphabet)
+
+        return np.where(codes == UNKNOWN, wildcard, codes).astype(np.uint8)
+
+    def __best_chain__(self, read: str):
+        anchors = self.index.seeds(read, self.max_occurrences)
+        max_gap = self.band + len(read) // 2
+
+        return chain(*anchors, self.index.k, max_gap)
+
+    def map(self, read: str, name: str = "") -> Mapping | None:
+        """
+        Maps a read, returns None if none of its k-mers are found.
+        """
+        candidates = [("+", read)]
+        if self.both_strands:
+            candidates.append(("-", reverse_complement(read)))
+
+        best = None
+
+        for strand, sequence in candidates:
+            score, anchors = self.__best_chain__(sequence)
+
+            if anchors and (best is None or score > best[0]):
+                best = score, strand, sequence, anchors
+
+        if best is None:
+            return None
+
+        _, strand, sequence, anchors = best
+        diagonals = [reference - query for query, reference in anchors]
+
+        # The window stays within the record of the first anchor
+        record = int(np.searchsorted(self.offsets, anchors[0][1], "right")) - 1
+        offset = int(self.offsets[record])
+        start = max(min(diagonals) - self.band, offset)
+        end = min(
+            max(diagonals) + len(sequence) + self.band, int(self.offsets[record + 1])
+        )
+
+        s = self.__alignment_codes__(self.scoring.encode(sequence, strict=False))
+        t = self.codes[start:end]
+
+        # Diagonal d of the reference is diagonal d - start of the window
+        k = max(abs(max(diagonals) - start), abs(min(diagonals) - start)) + self.band
+        k = max(k, abs(len(t) - len(s)))
+
+        D, B = banded_fill(s, t, self.alignment_scoring, False, k, free_row=True)
+        script = banded_backtracking(D, B, s, t, k, banded_end(D, k, False))
+
+        return Mapping(
+            name,
+            strand,
+            self.contigs[record],
+            start - offset + script.t_start,
+            start - offset + script.t_end,
+            script.score,
+            script.cigar(),
+            len(anchors),
+        )
+
+    def map_many(self, reads: Iterable[Tuple[str, str]]) -> Iterator[Mapping | None]:
+        """
+        Maps (name, read) pairs one after another.
+        """
+        for name, read in reads:
+            yield self.map(read, name)
+
+
+def main():
+    import argparse
+    import sys
+    from batch import read_fasta
+    from general_alignment import build_weight_matrix
+
+    parser = argparse.ArgumentParser(description="Seed-and-extend read mapper")
+    parser.add_argument("reference", type=str, help="FASTA file of the reference")
+    parser.add_argument("reads", type=str, help="FASTA file of the reads")
+    parser.add_argument("-k", type=int, default=15, help="Length of the k-mers")
+    parser.add_argument(
+        "--window", type=int, default=10, help="Minimizer window, 1 for all k-mers"
+    )
+    parser.add_argument(
+        "--max-occurrences",
+        type=int,
+        default=64,
+        help="Skip k-mers occurring more often in the reference",
+    )
+    parser.add_argument(
+        "--band",
+        type=int,
+        default=16,
+        help="Bases of reference added around the chain before aligning",
+    )
+    parser.add_argument("--match", type=int, default=0, help="Match score")
+    parser.add_argument("--indel", type=int, default=2, help="Indel score")
+    parser.add_argument(
+        "--substitution", type=int, default=3, help="Substitution score"
+    )
+
+    args = parser.parse_args()
+
+    with open(args.reference) as file:
+        records = list(read_fasta(file))
+
+    alphabet = sorted(set().union(*(sequence for _, sequence in records)))
+    w = build_weight_matrix(alphabet, args.match, args.indel, args.substitution)
+    mapper = ReadMapper(
+        records, w, args.k, args.window, args.max_occurrences, args.band
+    )
+
+    print("name\tstrand\tcontig\tstart\tend\tscore\tcigar")
+
+    with open(args.reads) as file:
+        for name, read in read_fasta(file):
+            mapping = mapper.map(read, name)
+
+            if mapping is None:
+                print(f"{name}\t*\t*\t*\t*\t*\t*")
+            else:
+                print(
+                    f"{name}\t{mapping.strand}\t{mapping.contig}\t"
+                    f"{mapping.reference_start}\t"
+                    f"{mapping.reference_end}\t{mapping.score}\t{mapping.cigar}"
+                )
+
+            sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import numpy as np
+
+
+def __bits__(mask: np.ndarray) -> int:
+    """
+    Packs a boolean array into an integer, element i becoming bit i.
+    """
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+
+def __pattern_masks__(s: np.ndarray):
+    """
+    Computes for every character of s the bit vector of its positions in s.
+    """
+    return {int(a): __bits__(s == a) for a in np.unique(s)}
+
+
+def myers(
+    s: np.ndarray,
+    t: np.ndarray,
+    free_start_s: bool = False,
+    free_start_t: bool = False,
+    free_end_s: bool = False,
+    free_end_t: bool = False,
+) -> int:
+    """
+    Computes the unit-cost edit distance of two encoded sequences with Myers'
+    bit-vector algorithm, in the formulation of Hyyroe (2001).
+
+    One column of the distance matrix is held as two bit vectors of vertical
+    deltas (+1 and -1), one bit per character of s, which Python integers of
+    arbitrary length update in O(len(s) / w) word operations per character of t.
+
+    The free start and end flags make leading or trailing parts of s and t
+    unaligned at no cost. Free start and end of t gives the search variant,
+    where s is matched against the best substring of t.
+    """
+    n = len(s)
+    m = len(t)
+
+    mask = (1 << n) - 1
+    high = 1 << (n - 1) if n else 0
+
+    masks = __pattern_masks__(s)
+
+    # Vertical deltas of column 0
+    VP = 0 if free_start_s else mask
+    VN = 0
+
+    score = 0 if free_start_s else n
+    best = score
+
+    for c in t.tolist():
+        Eq = masks.get(c, 0)
+
+        Xv = Eq | VN
+        Xh = (((Eq & VP) + VP) ^ VP) | Eq
+
+        HP = VN | (~(Xh | VP) & mask)
+        HN = VP & Xh
+
+        if HP & high:
+            score += 1
+        elif HN & high:
+            score -= 1
+
+        if n == 0 and not free_start_t:
+            score += 1
+
+        # Horizontal delta of row 0
+        HP = ((HP << 1) | (0 if free_start_t else 1)) & mask
+        HN = (HN << 1) & mask
+
+        VP = HN | (~(Xv | HP) & mask)
+        VN = HP & Xv
+
+        best = min(best, score)
+
+    if free_end_t:
+        score = best
+
+    if free_end_s and n:
+        # Walk up the last column using its vertical deltas
+        top = 0 if free_start_t else m
+        up = np.unpackbits(
+            np.frombuffer(VP.to_bytes((n + 7) // 8, "little"), dtype=np.uint8),
+            bitorder="little",
+        )[:n].astype(int)
+        down = np.unpackbits(
+            np.frombuffer(VN.to_bytes((n + 7) // 8, "little"), dtype=np.uint8),
+            bitorder="little",
+        )[:n].astype(int)
+        column = top + np.cumsum(up - down)
+        score = min(score, top, int(column.min()))
+
+    return score
@@ -0,0 +1,158 @@
+import numpy as np
+from typing import Dict, Iterable, Set
+
+GAP = "-"
+
+# Code used for characters outside of the alphabet while translating bytes
+UNKNOWN = 255
+
+
+class ScoringScheme:
+    """
+    Dense form of a weight matrix.
+
+    Every character of the alphabet is mapped to a uint8 code, so sequences can be
+    encoded once and scored by fancy-indexing into an int32 substitution matrix.
+    Deletion costs apply to characters of s aligned to a gap, insertion costs to
+    characters of t aligned to a gap.
+    """
+
+    def __init__(
+        self,
+        alphabet: Iterable[str],
+        substitution: np.ndarray,
+        deletion: np.ndarray,
+        insertion: np.ndarray,
+    ) -> None:
+        self.alphabet = list(alphabet)
+
+        if len(self.alphabet) >= UNKNOWN:
+            raise ValueError(f"Alphabet must have less than {UNKNOWN} characters")
+
+        self.codes = {a: k for k, a in enumerate(self.alphabet)}
+        self.substitution = np.asarray(substitution, dtype=np.int32)
+        self.deletion = np.asarray(deletion, dtype=np.int32)
+        self.insertion = np.asarray(insertion, dtype=np.int32)
+
+        weights = np.concatenate(
+            [self.substitution.ravel(), self.deletion, self.insertion]
+        )
+        self.min_weight = int(weights.min()) if len(weights) else 0
+        self.max_weight = int(weights.max()) if len(weights) else 0
+
+        # Translation table for bytes.translate, unknown bytes map to UNKNOWN
+        table = bytearray([UNKNOWN]) * 256
+        for a, code in self.codes.items():
+            if len(a) == 1 and ord(a) < 256:
+                table[ord(a)] = code
+        self.__table = bytes(table)
+
+    @classmethod
+    def build(
+        cls, alphabet: str | Set[str], match: int, indel: int, substitution: int
+    ) -> "ScoringScheme":
+        """
+        Builds a scoring scheme from the same inputs as build_weight_matrix.
+        """
+        alphabet = sorted(set(alphabet))
+        size = len(alphabet)
+
+        matrix = np.full((size, size), substitution, dtype=np.int32)
+        np.fill_diagonal(matrix, match)
+        gaps = np.full(size, indel, dtype=np.int32)
+
+        return cls(alphabet, matrix, gaps, gaps)
+
+    @classmethod
+    def from_weight_matrix(cls, w: Dict[str, Dict[str, int]]) -> "ScoringScheme":
+        """
+        Converts a nested weight dictionary (as built by build_weight_matrix).
+        """
+        alphabet = [a for a in w if a != GAP]
+
+        matrix = [[w[a][b] for b in alphabet] for a in alphabet]
+        deletion = [w[a][GAP] for a in alphabet]
+        insertion = [w[GAP][b] for b in alphabet]
+
+        return cls(
+            alphabet,
+            np.array(matrix, dtype=np.int32).reshape(len(alphabet), len(alphabet)),
+            deletion,
+            insertion,
+        )
+
+    def to_weight_matrix(self) -> Dict[str, Dict[str, int]]:
+        """
+        Converts the scheme back into a nested weight dictionary.
+        """
+        w = {
+            a: {b: int(self.substitution[i, j]) for j, b in enumerate(self.alphabet)}
+            for i, a in enumerate(self.alphabet)
+        }
+
+        w[GAP] = {b: int(self.insertion[j]) for j, b in enumerate(self.alphabet)}
+
+        for i, a in enumerate(self.alphabet):
+            w[a][GAP] = int(self.deletion[i])
+
+        return w
+
+    def is_unit_cost(self) -> bool:
+        """
+        Checks whether the scheme is the Levenshtein distance, i.e. 0 for matches
+        and 1 for substitutions and gaps.
+        """
+        unit = 1 - np.eye(len(self.alphabet), dtype=np.int32)
+
+        return bool(
+            (self.substitution == unit).all()
+            and (self.deletion == 1).all()
+            and (self.insertion == 1).all()
+        )
+
+    def encode(
+        self, sequence: str | bytes | np.ndarray, strict: bool = True
+    ) -> np.ndarray:
+        """
+        Encodes a sequence into a uint8 code array.
+        Arrays of codes are returned as they are, bytes are translated in one pass
+        and wrapped without further copies. Characters outside of the alphabet
+        raise a ValueError, or without strict are encoded as UNKNOWN.
+        """
+        if isinstance(sequence, np.ndarray):
+            return sequence
+
+        if isinstance(sequence, str):
+            try:
+                sequence = sequence.encode("latin-1")
+            except UnicodeEncodeError:
+                return self.__encode_characters__(sequence, strict)
+
+        codes = np.frombuffer(bytes(sequence).translate(self.__table), dtype=np.uint8)
+
+        if strict and len(codes) and codes.max() == UNKNOWN:
+            unknown = chr(sequence[int(np.argmax(codes == UNKNOWN))])
+            raise ValueError(f"Character {unknown!r} is not part of the alphabet")
+
+        return codes
+
+    def __encode_characters__(self, sequence: str, strict: bool) -> np.ndarray:
+        """
+        Encodes a sequence character by character, for alphabets outside of latin-1.
+        """
+        if not strict:
+            codes = [self.codes.get(a, UNKNOWN) for a in sequence]
+            return np.array(codes, dtype=np.uint8)
+
+        try:
+            return np.array([self.codes[a] for a in sequence], dtype=np.uint8)
+        except KeyError as error:
+            raise ValueError(
+                f"Character {error.args[0]!r} is not part of the alphabet"
+            ) from None
+
+    def decode(self, codes: np.ndarray) -> str:
+        """
+        Decodes a code array back into a string.
+        """
+        return "".join(self.alphabet[code] for code in codes.tolist())
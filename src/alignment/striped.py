@@ -0,0 +1,257 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+from scoring import ScoringScheme
+
+# Lane types tried in order, wider types are only used for targets that overflow
+LANE_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+@dataclass
+class Hit:
+    index: int
+    score: int
+    end: Tuple[int, int]
+    alignment: Tuple[str, str]
+
+
+class StripedSmithWaterman:
+    """
+    Score-only local alignment of one query against many targets (Farrar, 2007).
+
+    The query is split into `segments` stripes, position q living in segment
+    q % segments of lane q // segments. The query profile holds, for every
+    character of the alphabet, the substitution scores of all query positions in
+    this striped order, so a target column is scored with whole-array operations.
+    Vertical gaps are first propagated along the segments and then corrected
+    lazily across lane boundaries, which rarely needs more than one pass.
+
+    Targets are processed in batches that form an additional array axis, and
+    scores are kept in the narrowest integer type that does not overflow.
+    """
+
+    def __init__(
+        self,
+        query: str,
+        w: Dict[str, Dict[str, int]] | ScoringScheme,
+        segments: int = 8,
+    ) -> None:
+        self.query = query
+        self.w = w
+        self.scoring = (
+            w if isinstance(w, ScoringScheme) else ScoringScheme.from_weight_matrix(w)
+        )
+
+        n = len(query)
+        self.segments = segments
+        self.lanes = max(-(-n // segments), 1)
+
+        codes = self.scoring.encode(query)
+        size = self.segments * self.lanes
+
+        def stripe(values: np.ndarray):
+            # Position q of the query lives at [q % segments, q // segments]
+            return values.reshape(self.lanes, self.segments).T
+
+        # The last profile row belongs to the padding character of short targets
+        padded = np.zeros(size, dtype=np.intp)
+        padded[:n] = codes
+        alphabet_size = len(self.scoring.alphabet)
+        self.__profile = np.zeros((alphabet_size + 1, segments, self.lanes), dtype=int)
+        self.__profile[:-1] = self.scoring.substitution[:, stripe(padded)]
+        self.__padding = stripe(np.arange(size) >= n)
+
+        # Cost of moving down from position q to q + 1
+        deletion = np.zeros(size, dtype=int)
+        deletion[: max(n - 1, 0)] = self.scoring.deletion[codes[1:]]
+        self.__deletion = stripe(deletion)
+        self.__last = stripe(np.arange(size) >= n - 1)
+
+        self.__positions = stripe(np.arange(size))
+
+    def __lanes__(self, dtype):
+        """
+        Casts the profiles to the given lane type. Padding gets the lowest score,
+        so padded cells stay at 0 and never contribute to real ones.
+        """
+        low = np.iinfo(dtype).min
+
+        profile = self.__profile.astype(dtype)
+        profile[:, self.__padding] = low
+        profile[-1] = low
+
+        deletion = self.__deletion.astype(dtype)
+        deletion[self.__last] = low
+
+        insertion = np.append(self.scoring.insertion, low).astype(dtype)
+
+        return profile, deletion, insertion
+
+    def score(self, target: str) -> Tuple[int, int, int]:
+        """
+        Returns the best local score and the cell (i, j) where it is reached first
+        in row-major order, as SmithWaterman would find it with D.argmax().
+        """
+        scores, ends_i, ends_j = self.scores([target])
+        return int(scores[0]), int(ends_i[0]), int(ends_j[0])
+
+    def scores(self, targets: Sequence[str]):
+        """
+        Scores a batch of targets. Returns the best scores and their end cells.
+        """
+        padding = len(self.scoring.alphabet)
+        length = max((len(target) for target in targets), default=0)
+
+        t = np.full((len(targets), length), padding, dtype=np.intp)
+        for k, target in enumerate(targets):
+            codes = self.scoring.encode(target)
+            t[k, : len(codes)] = codes
+
+        scores = np.zeros(len(targets), dtype=int)
+        ends_i = np.zeros(len(targets), dtype=int)
+        ends_j = np.zeros(len(targets), dtype=int)
+
+        pending = np.arange(len(targets))
+
+        for dtype in LANE_TYPES:
+            info = np.iinfo(dtype)
+
+            if self.scoring.min_weight < info.min or self.scoring.max_weight > info.max:
+                continue
+
+            best, best_i, best_j, overflow = self.__score__(t[pending], dtype)
+
+            done = pending[~overflow]
+            scores[done] = best[~overflow]
+            ends_i[done] = best_i[~overflow]
+            ends_j[done] = best_j[~overflow]
+
+            pending = pending[overflow]
+
+            if len(pending) == 0:
+                return scores, ends_i, ends_j
+
+        raise OverflowError("Scores do not fit into 64 bit integers")
+
+    def __score__(self, t: np.ndarray, dtype):
+        """
+        Runs the striped algorithm on a batch of encoded targets with one lane type.
+        Arrays are laid out as (target, segment, lane).
+        """
+        T, J = t.shape
+        S = self.segments
+        L = self.lanes
+
+        profile, deletion, insertion = self.__lanes__(dtype)
+        limit = np.iinfo(dtype).max - max(self.scoring.max_weight, 0)
+
+        H = np.zeros((T, S, L), dtype=dtype)
+        diagonal = np.zeros((T, S, L), dtype=dtype)
+
+        best = np.zeros(T, dtype=int)
+        best_i = np.zeros(T, dtype=int)
+        best_j = np.zeros(T, dtype=int)
+        overflow = np.zeros(T, dtype=bool)
+
+        for j in range(J):
+            # Diagonal predecessor of q is q - 1 in the previous column
+            diagonal[:, 1:] = H[:, :-1]
+            diagonal[:, 0, 1:] = H[:, -1, :-1]
+            diagonal[:, 0, 0] = 0
+
+            current = diagonal + profile[t[:, j]]
+            np.maximum(current, H + insertion[t[:, j], None, None], out=current)
+            np.maximum(current, 0, out=current)
+
+            # Vertical gaps within the lanes
+            for segment in range(1, S):
+                np.maximum(
+                    current[:, segment],
+                    current[:, segment - 1] + deletion[segment - 1],
+                    out=current[:, segment],
+                )
+
+            # Lazy correction of vertical gaps crossing lane boundaries
+            F = current[:, -1] + deletion[-1]
+            segment = 0
+
+            while True:
+                if segment == 0:
+                    F[:, 1:] = F[:, :-1].copy()
+                    F[:, 0] = 0
+
+                if not (F > current[:, segment]).any():
+                    break
+
+                np.maximum(current[:, segment], F, out=current[:, segment])
+                F = current[:, segment] + deletion[segment]
+                segment = (segment + 1) % S
+
+            H = current
+
+            column_max = H.max(axis=(1, 2)).astype(int)
+            overflow |= column_max > limit
+
+            improved = np.nonzero((column_max > 0) & (column_max >= best))[0]
+
+            if len(improved):
+                # First query position reaching the maximum, to break ties like argmax
+                rows = np.where(
+                    H[improved] == column_max[improved, None, None],
+                    self.__positions,
+                    S * L,
+                ).min(axis=(1, 2))
+
+                better = (column_max[improved] > best[improved]) | (
+                    rows + 1 < best_i[improved]
+                )
+                update = improved[better]
+
+                best[update] = column_max[update]
+                best_i[update] = rows[better] + 1
+                best_j[update] = j + 1
+
+        return best, best_i, best_j, overflow
+
+    def __hits__(self, batch: List[str], offset: int, threshold: int) -> List[Hit]:
+        """
+        Scores a batch and aligns the targets whose score reaches the threshold.
+        The traceback only needs the matrix up to the end cell, so it is run on
+        the prefixes of query and target.
+        """
+        from alignment_algorithms import SmithWaterman
+
+        hits = []
+        scores, ends_i, ends_j = self.scores(batch)
+
+        for k in np.nonzero((scores >= threshold) & (scores > 0))[0]:
+            i, j = int(ends_i[k]), int(ends_j[k])
+            alignment = SmithWaterman(
+                self.query[:i], batch[k][:j], self.scoring, True
+            ).alignment
+            hits.append(Hit(offset + int(k), int(scores[k]), (i, j), alignment))
+
+        return hits
+
+    def search(
+        self, targets: Iterable[str], threshold: int, batch_size: int = 256
+    ) -> List[Hit]:
+        """
+        Scores all targets in batches and returns the hits reaching the threshold.
+        """
+        hits: List[Hit] = []
+        batch: List[str] = []
+        offset = 0
+
+        for target in targets:
+            batch.append(target)
+
+            if len(batch) == batch_size:
+                hits.extend(self.__hits__(batch, offset, threshold))
+                offset += len(batch)
+                batch = []
+
+        if batch:
+            hits.extend(self.__hits__(batch, offset, threshold))
+
+        return hits
@@ -2,10 +2,26 @@ from alignment_algorithms import (
     NeedlemanWunsch,
     SmithWaterman,
     SemiGlobal,
+    ScoringScheme,
     build_weight_matrix,
 )
+from banded import banded_backtracking, banded_end, banded_fill
+from batch import align_many, read_pairs, write_results
+from distance_matrix import pairwise_distances
+from general_alignment import Alignment, alignment_score
+from four_russians import block_tables
+from hirschberg import hirschberg
+from kernels import fill_matrices
+from mapper import ReadMapper, reverse_complement
+from myers import myers
+from striped import StripedSmithWaterman
 import hashlib
+import io
+import numpy as np
+import random
 import pytest
+import tracemalloc
+import worker_pool
 
 
 def test_aligners():
@@ -52,6 +68,714 @@ def test_smith_waterman():
 
 
 def test_semi_global():
-    with pytest.raises(UserWarning):
-        matrix = build_weight_matrix("ACGT", 0, 2, 3)
-        SemiGlobal("ACGATTATTT", "TAGTAATCG", matrix, False)
+    # Overlap of a suffix of s with a prefix of t
+    w = build_weight_matrix("ACGT", 2, -3, -2)
+    overlap = SemiGlobal(
+        "GGCATTACGTTGCA",
+        "ACGTAGCACCTTAG",
+        w,
+        True,
+        free_start_s=True,
+        free_start_t=False,
+    )
+    script = overlap.edit_script
+    assert overlap.score == 12
+    assert (script.s_start, script.s_end, script.t_start, script.t_end) == (6, 14, 0, 8)
+    assert overlap.alignment == ("ACGTTGCA", "ACGTAGCA")
+
+    # s fitted into t, which is free at both ends by default
+    w = build_weight_matrix("ACGT", 0, 2, 3)
+    fitted = SemiGlobal("ACGTTG", "CCACGATGAA", w, False)
+    script = fitted.edit_script
+    assert (fitted.score, script.cigar()) == (3, "3=1X2=")
+    assert (script.t_start, script.t_end) == (2, 8)
+
+    random.seed(20)
+    scoring = ScoringScheme.from_weight_matrix(w)
+    for _ in range(20):
+        s = "".join(random.choices("ACGT", k=random.randint(0, 20)))
+        t = "".join(random.choices("ACGT", k=random.randint(0, 20)))
+        free_ends = [random.random() < 0.5 for _ in range(4)]
+        options = dict(
+            zip(["free_start_s", "free_start_t", "free_end_s", "free_end_t"], free_ends)
+        )
+
+        alignment = SemiGlobal(s, t, w, False, **options)
+        D, B = alignment.__generate_matrix_naive__(s, t)
+        assert (D == alignment.D).all() and (B == alignment.B).all()
+        assert (
+            alignment.edit_script.evaluate(
+                scoring.encode(s), scoring.encode(t), scoring
+            )
+            == alignment.score
+        )
+        assert (
+            alignment.score
+            == SemiGlobal(s, t, w, False, score_only=True, **options).score
+        )
+
+
+def test_vectorized_fill():
+    random.seed(0)
+
+    schemes = [
+        (build_weight_matrix("ACGT", 0, 2, 3), False),
+        (build_weight_matrix("ACGT", 3, -2, -3), True),
+    ]
+
+    for _ in range(20):
+        s = "".join(random.choices("ACGT", k=random.randint(1, 15)))
+        t = "".join(random.choices("ACGT", k=random.randint(1, 15)))
+
+        for matrix, is_similarity in schemes:
+            alignment = NeedlemanWunsch(s, t, matrix, is_similarity)
+
+            for type in Alignment.AlignmentType:
+                alignment.type = type
+                D, B = alignment.__generate_matrix__(
+                    alignment.s_codes, alignment.t_codes
+                )
+                D_naive, B_naive = alignment.__generate_matrix_naive__(s, t)
+
+                assert (D == D_naive).all()
+                assert (B == B_naive).all()
+
+
+def test_compact_backtracking_matrix():
+    matrix = build_weight_matrix("ACGT", 0, 2, 3)
+
+    nw = NeedlemanWunsch("ACCGGTA", "AGGCTG", matrix)
+
+    assert nw.B.dtype == np.uint8
+    assert nw.direction(0, 0) == Alignment.Direction.NONE
+    assert nw.direction(0, 1) == Alignment.Direction.LEFT
+    assert nw.direction(1, 0) == Alignment.Direction.UP
+    assert nw.direction(1, 1) == Alignment.Direction.DIAG
+
+
+def test_scoring_scheme():
+    matrix = build_weight_matrix("ACGT", 0, 2, 3)
+    scheme = ScoringScheme.build("ACGT", 0, 2, 3)
+
+    assert scheme.to_weight_matrix() == matrix
+    assert ScoringScheme.from_weight_matrix(matrix).to_weight_matrix() == matrix
+    assert scheme.substitution.dtype == np.int32
+    assert scheme.min_weight == 0
+
+    codes = scheme.encode(b"GATTACA")
+    assert codes.dtype == np.uint8
+    assert scheme.decode(codes) == "GATTACA"
+    assert (scheme.encode("GATTACA") == codes).all()
+    assert scheme.encode(codes) is codes
+
+    with pytest.raises(ValueError):
+        scheme.encode("GATTAXA")
+
+    nw = NeedlemanWunsch("ACCGGTA", "AGGCTG", scheme)
+    assert nw.alignment == ("ACCGG-TA", "A--GGCTG")
+
+    with pytest.raises(ValueError):
+        NeedlemanWunsch("ACG", "ACG", ScoringScheme.build("ACGT", 0, -2, 3))
+
+
+def aligned_score(alignment, matrix):
+    return sum(matrix[a][b] for a, b in zip(*alignment))
+
+
+def test_hirschberg():
+    matrix = build_weight_matrix("ACGT", 0, 2, 3)
+    random.seed(1)
+
+    for _ in range(20):
+        s = "".join(random.choices("ACGT", k=random.randint(0, 30)))
+        t = "".join(random.choices("ACGT", k=random.randint(0, 30)))
+
+        nw = NeedlemanWunsch(s, t, matrix)
+        h = NeedlemanWunsch(s, t, matrix, hirschberg=True)
+
+        assert h.alignment[0].replace("-", "") == s
+        assert h.alignment[1].replace("-", "") == t
+        assert aligned_score(h.alignment, matrix) == nw.D[-1, -1]
+
+        # Leaves of a few cells exercise the deepest recursion
+        scoring = ScoringScheme.from_weight_matrix(matrix)
+        for leaf_size in [1, 16, 200]:
+            script = hirschberg(s, t, scoring, False, leaf_size=leaf_size)
+            assert script.score == nw.D[-1, -1]
+            assert (script.s_end, script.t_end) == (len(s), len(t))
+
+
+def test_parallel_hirschberg():
+    matrix = build_weight_matrix("ACGT", 3, -2, -3)
+    random.seed(10)
+
+    s = "".join(random.choices("ACGT", k=60))
+    t = "".join(random.choices("ACGT", k=50))
+
+    sequential = NeedlemanWunsch(s, t, matrix, True, hirschberg=True)
+    parallel = NeedlemanWunsch(
+        s, t, matrix, True, hirschberg=True, workers=2, parallel_min_size=100
+    )
+
+    assert parallel.edit_script.cigar() == sequential.edit_script.cigar()
+    assert parallel.alignment == sequential.alignment
+    assert parallel.score == sequential.score
+
+    # Small leaves, so that the pair is split on the process pool
+    scoring = ScoringScheme.from_weight_matrix(matrix)
+    sequential = hirschberg(s, t, scoring, True, leaf_size=16)
+    parallel = hirschberg(s, t, scoring, True, workers=2, min_size=10, leaf_size=16)
+
+    assert parallel.cigar() == sequential.cigar()
+    assert (
+        parallel.score == sequential.score == NeedlemanWunsch(s, t, matrix, True).score
+    )
+    ends = (parallel.s_start, parallel.s_end, parallel.t_start, parallel.t_end)
+    assert ends == (0, len(s), 0, len(t))
+
+    with pytest.raises(ValueError):
+        NeedlemanWunsch(s, t, matrix, workers=2)
+
+
+def test_banded():
+    matrix = build_weight_matrix("ACGT", 0, 2, 3)
+    random.seed(2)
+
+    for _ in range(20):
+        s = "".join(random.choices("ACGT", k=random.randint(0, 30)))
+        t = "".join(random.choices("ACGT", k=random.randint(0, 30)))
+
+        nw = NeedlemanWunsch(s, t, matrix)
+        banded = NeedlemanWunsch(s, t, matrix, band=2, widen_band=True)
+
+        assert banded.band_optimal
+        assert banded.D.shape == (len(s) + 1, 2 * banded.band + 1)
+        assert aligned_score(banded.alignment, matrix) == nw.D[-1, -1]
+
+        full = NeedlemanWunsch(s, t, matrix, band=max(len(s), len(t)))
+        assert full.alignment == nw.alignment
+
+    # With a free first row and the best end of the last row, s is fitted into t
+    scoring = ScoringScheme.from_weight_matrix(matrix)
+    for _ in range(20):
+        s = "".join(random.choices("ACGT", k=random.randint(0, 20)))
+        t = "".join(random.choices("ACGT", k=random.randint(0, 30)))
+        s_codes, t_codes = scoring.encode(s), scoring.encode(t)
+        k = max(len(s), len(t))
+
+        D, B = banded_fill(s_codes, t_codes, scoring, False, k, free_row=True)
+        script = banded_backtracking(D, B, s_codes, t_codes, k, banded_end(D, k, False))
+        fitted = SemiGlobal(s, t, matrix, False)
+
+        assert script.score == fitted.score
+        assert script.evaluate(s_codes, t_codes, scoring) == fitted.score
+
+    similar = NeedlemanWunsch("ACCGGTA", "ACCGTA", matrix, band=1)
+    assert similar.band_optimal
+    assert similar.alignment == ("ACCGGTA", "ACC-GTA")
+
+    with pytest.raises(ValueError):
+        Alignment("ACG", "ACG", matrix, Alignment.AlignmentType.LOCAL, False, band=1)
+
+    with pytest.raises(ValueError):
+        NeedlemanWunsch("ACG", "ACG", matrix, hirschberg=True, band=1)
+
+
+def test_striped_smith_waterman():
+    random.seed(3)
+
+    for match, indel, substitution in [(3, -2, -3), (60, -100, -50)]:
+        matrix = build_weight_matrix("ACGT", match, indel, substitution)
+
+        query = "".join(random.choices("ACGT", k=30))
+        targets = ["".join(random.choices("ACGT", k=random.randint(0, 40)))]
+        targets += [query[5:25], ""]
+
+        striped = StripedSmithWaterman(query, matrix, segments=4)
+        hits = striped.search(targets, threshold=1, batch_size=2)
+
+        for k, target in enumerate(targets):
+            sw = SmithWaterman(query, target, matrix, True)
+            end = np.unravel_index(sw.D.argmax(), sw.D.shape)
+
+            assert striped.score(target) == (sw.D.max(), *end)
+
+            # Single pairs use score rows, the striped engine only on request
+            for backend in [Alignment.Backend.AUTO, Alignment.Backend.STRIPED]:
+                assert sw.D.max() == alignment_score(
+                    query, target, matrix, Alignment.AlignmentType.LOCAL, True, backend
+                )
+
+            if sw.D.max() > 0:
+                hit = next(hit for hit in hits if hit.index == k)
+                assert hit.alignment == sw.alignment
+
+
+def test_unit_cost_score():
+    unit = build_weight_matrix("ACGT", 0, 1, 1)
+    assert ScoringScheme.from_weight_matrix(unit).is_unit_cost()
+    assert not ScoringScheme.build("ACGT", 0, 2, 3).is_unit_cost()
+
+    random.seed(4)
+
+    for _ in range(20):
+        s = "".join(random.choices("ACGT", k=random.randint(0, 80)))
+        t = "".join(random.choices("ACGT", k=random.randint(0, 80)))
+
+        nw = NeedlemanWunsch(s, t, unit)
+        assert alignment_score(s, t, unit) == nw.D[-1, -1]
+
+        scheme = ScoringScheme.build("ACGT", 0, 1, 1)
+        # By default, s is fitted into t
+        D, _ = fill_matrices(
+            scheme.encode(s), scheme.encode(t), scheme, False, False, True, False
+        )
+        semi_global = D[-1].min()
+        assert (
+            alignment_score(s, t, unit, Alignment.AlignmentType.SEMI_GLOBAL)
+            == semi_global
+        )
+
+    scheme = ScoringScheme.build("ACGT", 0, 1, 1)
+    pattern = scheme.encode("GATTACA")
+    text = scheme.encode("CCCCGATACACCCC")
+    assert myers(pattern, text, free_start_t=True, free_end_t=True) == 1
+
+    sw = SmithWaterman(
+        "ACGATTATTT", "TAGTAATCG", build_weight_matrix("ACGT", 3, -2, -3), True
+    )
+    assert (
+        alignment_score(
+            "ACGATTATTT",
+            "TAGTAATCG",
+            build_weight_matrix("ACGT", 3, -2, -3),
+            Alignment.AlignmentType.LOCAL,
+            True,
+        )
+        == sw.D.max()
+    )
+
+
+def test_score_only_and_render():
+    matrix = build_weight_matrix("ACGT", 0, 2, 3)
+
+    nw = NeedlemanWunsch("ACCGGTA", "AGGCTG", matrix)
+    assert nw.score == 9
+
+    score_only = NeedlemanWunsch("ACCGGTA", "AGGCTG", matrix, score_only=True)
+    assert score_only.score == 9
+    assert score_only.alignment is None
+    assert not hasattr(score_only, "B")
+    assert str(score_only) == "Score:\n9\n"
+
+    output = io.StringIO()
+    nw.render(output)
+    assert output.getvalue() == str(nw)
+
+    h = NeedlemanWunsch("ACCGGTA", "AGGCTG", matrix, hirschberg=True)
+    assert h.score == 9
+
+    with pytest.raises(ValueError):
+        NeedlemanWunsch("ACG", "ACG", matrix, hirschberg=True, score_only=True)
+
+
+def test_edit_script():
+    matrix = build_weight_matrix("ACGT", 0, 2, 3)
+
+    nw = NeedlemanWunsch("ACCGGTA", "AGGCTG", matrix)
+    script = nw.edit_script
+
+    assert script.cigar() == "1=2I2=1D1=1X"
+    assert script.cigar(extended=False) == "1M2I2M1D2M"
+    assert (script.s_start, script.s_end, script.t_start, script.t_end) == (0, 7, 0, 6)
+    assert script.score == 9
+    assert script.identity == 4 / 8
+    assert len(script) == 8
+    assert script.aligned("ACCGGTA", "AGGCTG") == nw.alignment
+
+    h = NeedlemanWunsch("ACCGGTA", "AGGCTG", matrix, hirschberg=True)
+    assert h.edit_script.cigar() == script.cigar()
+    assert h.edit_script.score == 9
+
+    sw = SmithWaterman(
+        "ACGATTATTT", "TAGTAATCG", build_weight_matrix("ACGT", 3, -2, -3), True
+    )
+    assert (sw.edit_script.s_start, sw.edit_script.s_end) == (0, 8)
+    assert (sw.edit_script.t_start, sw.edit_script.t_end) == (1, 7)
+    assert sw.edit_script.cigar() == "1=1I1=1I1=1X2="
+
+
+def test_memory_budget():
+    matrix = build_weight_matrix("ACGT", 0, 2, 3)
+    s = "ACCGGTA" * 60
+    t = "AGGCTG" * 70
+
+    nw = NeedlemanWunsch(s, t, matrix)
+    assert nw.strategy == Alignment.Strategy.FULL
+    assert nw.estimated_cells == len(s) * len(t)
+
+    full = NeedlemanWunsch(s, t, matrix, memory_budget=nw.estimated_memory)
+    assert full.strategy == Alignment.Strategy.FULL
+
+    small = NeedlemanWunsch(s, t, matrix, memory_budget=nw.estimated_memory // 2)
+    assert small.strategy == Alignment.Strategy.HIRSCHBERG
+    assert small.estimated_memory <= nw.estimated_memory // 2
+    assert small.score == nw.score
+
+    banded = NeedlemanWunsch(s, t, matrix, band=30, memory_budget=10**6)
+    assert banded.strategy == Alignment.Strategy.BANDED
+
+    score_only = SmithWaterman(s, t, matrix, False, score_only=True)
+    local = SmithWaterman(
+        s, t, matrix, False, memory_budget=score_only.estimated_memory
+    )
+    assert local.strategy == Alignment.Strategy.SCORE_ONLY
+    assert local.alignment is None
+    assert local.score == SmithWaterman(s, t, matrix, False).score
+
+    with pytest.raises(MemoryError):
+        NeedlemanWunsch(s, t, matrix, memory_budget=100)
+
+    with pytest.raises(ValueError):
+        NeedlemanWunsch(s, t, matrix, hirschberg=True, memory_budget=10**6)
+
+
+def test_memory_estimates():
+    random.seed(13)
+    distance = build_weight_matrix("ACGT", 0, 2, 3)
+    similarity = build_weight_matrix("ACGT", 3, -2, -3)
+
+    def peak(aligner, s, t, matrix, is_similarity, **kwargs):
+        # The first run loads modules and caches (and coverage data) that are
+        # not part of the alignment, so only the second run is measured
+        aligner(s, t, matrix, is_similarity, **kwargs)
+        tracemalloc.start()
+        alignment = aligner(s, t, matrix, is_similarity, **kwargs)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak, alignment.estimated_memory
+
+    cases = [
+        (NeedlemanWunsch, distance, False, {"score_only": True}),
+        (SmithWaterman, similarity, True, {"score_only": True}),
+        (SemiGlobal, distance, False, {"score_only": True}),
+        (NeedlemanWunsch, distance, False, {"hirschberg": True}),
+        (NeedlemanWunsch, distance, False, {"band": 50}),
+        (NeedlemanWunsch, distance, False, {}),
+        (SmithWaterman, similarity, True, {}),
+    ]
+
+    for n, m in [(1, 1), (1500, 1200), (300, 2000)]:
+        s = "".join(random.choices("ACGT", k=n))
+        t = "".join(random.choices("ACGT", k=m))
+
+        for aligner, matrix, is_similarity, kwargs in cases:
+            measured, estimated = peak(aligner, s, t, matrix, is_similarity, **kwargs)
+            assert measured <= estimated, (n, m, aligner.__name__, kwargs)
+
+
+def test_checkpointed_matrices(tmp_path):
+    random.seed(12)
+
+    schemes = [
+        (build_weight_matrix("ACGT", 0, 2, 3), False, NeedlemanWunsch),
+        (build_weight_matrix("ACGT", 3, -2, -3), True, SmithWaterman),
+    ]
+
+    for matrix, is_similarity, aligner in schemes:
+        s = "".join(random.choices("ACGT", k=40))
+        t = "".join(random.choices("ACGT", k=35))
+
+        full = aligner(s, t, matrix, is_similarity)
+        on_disk = aligner(
+            s,
+            t,
+            matrix,
+            is_similarity,
+            scratch_directory=str(tmp_path),
+            checkpoint_interval=6,
+        )
+
+        assert on_disk.strategy == Alignment.Strategy.CHECKPOINTED
+        assert isinstance(on_disk.B, np.memmap)
+        assert on_disk.D.checkpoints.shape == (7, len(t) + 1)
+        assert all((on_disk.D[i] == full.D[i]).all() for i in range(len(s) + 1))
+        assert on_disk.alignment == full.alignment
+        assert str(on_disk) == str(full)
+
+    with pytest.raises(ValueError):
+        NeedlemanWunsch(
+            s, t, schemes[0][0], hirschberg=True, scratch_directory=str(tmp_path)
+        )
+
+
+def test_wavefront():
+    random.seed(13)
+
+    for indel, substitution in [(2, 3), (1, 1), (3, 1)]:
+        matrix = build_weight_matrix("ACGT", 0, indel, substitution)
+
+        for _ in range(20):
+            s = "".join(random.choices("ACGT", k=random.randint(0, 40)))
+            t = list(s)
+            for _ in range(random.randint(0, 4)):
+                t.insert(random.randint(0, len(t)), random.choice("ACGT"))
+            t = "".join(t)
+
+            nw = NeedlemanWunsch(s, t, matrix)
+            wfa = NeedlemanWunsch(s, t, matrix, wavefront=True)
+
+            assert wfa.strategy == Alignment.Strategy.WAVEFRONT
+            assert wfa.score == nw.score
+            assert aligned_score(wfa.alignment, matrix) == nw.score
+            assert wfa.alignment[0].replace("-", "") == s
+            assert wfa.alignment[1].replace("-", "") == t
+
+    matrix = build_weight_matrix("ACGT", 0, 2, 3)
+    fallback = NeedlemanWunsch(
+        "AAAAAAAA", "CCCCCCCC", matrix, wavefront=True, max_wavefront_score=5
+    )
+    assert fallback.strategy == Alignment.Strategy.FULL
+    assert fallback.score == 24
+
+    with pytest.raises(ValueError):
+        NeedlemanWunsch(
+            "ACG", "ACG", build_weight_matrix("ACGT", 1, 2, 3), wavefront=True
+        )
+
+
+def test_align_many():
+    matrix = build_weight_matrix("ACGT", 0, 2, 3)
+    fasta = ">a first\nACCGG\nTA\n>b\nAGGCTG\n>c\nACGT\n>d\nACG\n"
+    tsv = "a\tACCGGTA\tAGGCTG\nc\tACGT\tACG\n"
+
+    serial = list(align_many(read_pairs(io.StringIO(fasta)), matrix))
+    parallel = align_many(
+        read_pairs(io.StringIO(tsv)), matrix, workers=2, chunk_size=1, max_pending=1
+    )
+
+    assert serial == list(parallel)
+    assert [result.name for result in serial] == ["a", "c"]
+    assert serial[0].score == 9
+    assert (
+        serial[0].cigar
+        == NeedlemanWunsch("ACCGGTA", "AGGCTG", matrix).edit_script.cigar()
+    )
+
+    similarity = build_weight_matrix("ACGT", 3, -2, -3)
+    scores = align_many(
+        [("x", "ACGT", "ACG")], similarity, SmithWaterman, True, score_only=True
+    )
+    output = io.StringIO()
+    write_results(scores, output, "tsv")
+    assert output.getvalue().splitlines()[1] == "x\t9\t\t\t\t\t\t"
+
+    # Serial runs keep their settings to themselves and can be interleaved
+    pairs = [("a", "ACCGGTA", "AGGCTG"), ("c", "ACGT", "ACG")]
+    local = align_many(pairs, similarity, SmithWaterman, True, chunk_size=1)
+    distances = align_many(pairs, matrix, chunk_size=1)
+    results = [next(local), next(distances), next(local), next(distances)]
+    assert results[1::2] == serial
+    assert (
+        results[0].score == SmithWaterman("ACCGGTA", "AGGCTG", similarity, True).score
+    )
+    assert not worker_pool.__worker__
+
+    with pytest.raises(ValueError):
+        list(read_pairs(io.StringIO(">a\nACGT\n")))
+
+
+def test_pairwise_distances():
+    matrix = build_weight_matrix("ACGT", 0, 2, 3)
+    random.seed(15)
+
+    sequences = ["".join(random.choices("ACGT", k=random.randint(5, 25)))]
+    for _ in range(9):
+        sequence = list(random.choice(sequences))
+        sequence[random.randrange(len(sequence))] = random.choice("ACGT")
+        sequences.append("".join(sequence) + "".join(random.choices("ACGT", k=2)))
+
+    dense = pairwise_distances(sequences, matrix)
+    bounded = pairwise_distances(
+        sequences, matrix, threshold=10, workers=2, tile_size=3
+    )
+    condensed = pairwise_distances(sequences, matrix, threshold=10, condensed=True)
+
+    for i, s in enumerate(sequences):
+        assert dense[i, i] == 0
+
+        for j, t in enumerate(sequences[i + 1 :], i + 1):
+            distance = NeedlemanWunsch(s, t, matrix).score
+
+            assert dense[i, j] == dense[j, i] == distance
+            assert bounded[i, j] == (distance if distance <= 10 else np.inf)
+
+    assert (condensed == bounded[np.triu_indices(len(sequences), 1)]).all()
+    assert np.isinf(condensed).any() and np.isfinite(condensed).any()
+    assert not worker_pool.__worker__
+
+
+def test_four_russians():
+    unit = ScoringScheme.build("ACGT", 0, 1, 1)
+    random.seed(16)
+
+    for _ in range(30):
+        s = "".join(random.choices("ACGT", k=random.randint(0, 40)))
+        t = "".join(random.choices("ACGT", k=random.randint(0, 40)))
+
+        expected = NeedlemanWunsch(s, t, unit).score
+        backend = Alignment.Backend.FOUR_RUSSIANS
+
+        assert alignment_score(s, t, unit, backend=backend) == expected
+        assert (
+            NeedlemanWunsch(s, t, unit, score_only=True, backend=backend).score
+            == expected
+        )
+
+    with pytest.raises(ValueError):
+        alignment_score(
+            "ACG", "AG", ScoringScheme.build("ACGT", 0, 2, 3), backend=backend
+        )
+
+    with pytest.raises(ValueError):
+        NeedlemanWunsch("ACG", "AG", unit, backend=backend)
+
+    # The DNA tables are built in chunks, in little more memory than they take
+    block_tables.cache_clear()
+    tracemalloc.start()
+    bottom, right = block_tables(4, 3)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak < 2 * (bottom.nbytes + right.nbytes)
+
+
+def test_read_mapper():
+    random.seed(17)
+    reference = "".join(random.choices("ACGT", k=20000))
+    mapper = ReadMapper(reference, ScoringScheme.build("ACGT", 0, 2, 3), k=11)
+
+    for position in [0, 5000, 19900]:
+        read = list(reference[position : position + 100])
+        read[30] = "A" if read[30] != "A" else "C"
+        del read[60]
+        read = "".join(read)
+
+        mapping = mapper.map(read, "forward")
+        assert (mapping.strand, mapping.reference_start) == ("+", position)
+        assert mapping.reference_end == position + 100
+        assert mapping.cigar == "30=1X29=1D39="
+        assert mapping.score == 5
+
+        mapping = mapper.map(reverse_complement(read))
+        assert (mapping.strand, mapping.reference_start) == ("-", position)
+
+    assert mapper.map("ACGT") is None
+
+    # Indels before the first or after the last seed move the ends of the read
+    insertion = "".join(random.choices("ACGT", k=10))
+    reads = [
+        (reference[5000:5012] + insertion + reference[5012:5100], 5100),
+        (reference[5000:5020] + reference[5030:5110], 5110),
+        (reference[5000:5088] + insertion + reference[5088:5100], 5100),
+        (reference[5000:5080] + reference[5090:5110], 5110),
+    ]
+
+    for read, end in reads:
+        mapping = mapper.map(read)
+        assert (mapping.reference_start, mapping.reference_end) == (5000, end)
+        assert mapping.score == 20
+
+    # Ambiguity codes have complements, so N does not disable the reverse strand
+    assert reverse_complement("ACGNRY") == "RYNCGT"
+    masked = reference[:8000] + "N" * 100 + reference[8100:]
+    masked_mapper = ReadMapper(masked, ScoringScheme.build("ACGTN", 0, 2, 3), k=11)
+    mapping = masked_mapper.map(reverse_complement(reference[5000:5100]))
+    assert (mapping.strand, mapping.reference_start) == ("-", 5000)
+
+    # Characters outside of the alphabet are no seeds and aligned as mismatches
+    read = reference[5000:5040] + "NX" + reference[5042:5100]
+    for strand, sequence in [("+", read), ("-", reverse_complement(read))]:
+        mapping = mapper.map(sequence)
+        assert (mapping.strand, mapping.reference_start) == (strand, 5000)
+        assert (mapping.cigar, mapping.score) == ("40=2X58=", 6)
+    assert mapper.map("N" * 30) is None
+
+    # The alignment is banded around the chain, the full matrix would take 144 MB
+    tracemalloc.start()
+    mapping = mapper.map(reference[2000:6000])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert (mapping.reference_start, mapping.cigar) == (2000, "4000=")
+    assert peak < 20 * 10**6
+
+    records = [("chr1", reference[:12000]), ("chr2", reference[12000:])]
+    mapper = ReadMapper(records, ScoringScheme.build("ACGT", 0, 2, 3), k=11)
+
+    for position, contig, start in [(5000, "chr1", 5000), (15000, "chr2", 3000)]:
+        mapping = mapper.map(reference[position : position + 100])
+        assert (mapping.contig, mapping.reference_start) == (contig, start)
+        assert mapping.cigar == "100="
+
+    # The last bases of chr1 are not joined to the first ones of chr2
+    mapping = mapper.map(reference[11950:12050])
+    assert mapping.contig in ("chr1", "chr2")
+    assert mapping.reference_end - mapping.reference_start <= 100
+
+
+def test_waterman_eggert():
+    w = build_weight_matrix("ACGT", 3, -2, -3)
+    alignment = SmithWaterman(
+        "GATTACATTTTTGCGCGCAAAGATTACA", "CCGATTACACCCGCGCGCTT", w, True
+    )
+    alignments = alignment.top_alignments(3)
+
+    assert [(a.score, a.s_start, a.t_start, a.cigar()) for a in alignments] == [
+        (26, 0, 2, "7=2I3X6="),
+        (21, 21, 2, "7="),
+        (15, 13, 11, "5="),
+    ]
+    assert alignments[0].cigar() == alignment.edit_script.cigar()
+    assert len(alignment.top_alignments(10, min_score=13)) == 3
+
+    with pytest.raises(ValueError):
+        NeedlemanWunsch("GATTACA", "GATTACA", w, True).top_alignments(2)
+
+
+def test_threaded_backend():
+    random.seed(19)
+    threaded = Alignment.Backend.THREADED
+    distance = build_weight_matrix("ACGT", 0, 2, 3)
+    similarity = build_weight_matrix("ACGT", 3, -2, -3)
+
+    for _ in range(20):
+        s = "".join(random.choices("ACGT", k=random.randint(0, 60)))
+        t = "".join(random.choices("ACGT", k=random.randint(0, 60)))
+        tile_size = random.randint(1, 16)
+
+        reference = NeedlemanWunsch(s, t, distance)
+        alignment = NeedlemanWunsch(
+            s, t, distance, backend=threaded, workers=3, tile_size=tile_size
+        )
+        assert (alignment.D == reference.D).all()
+        assert (alignment.B == reference.B).all()
+        assert alignment.edit_script.cigar() == reference.edit_script.cigar()
+
+        local = SmithWaterman(
+            s, t, similarity, True, backend=threaded, workers=2, tile_size=tile_size
+        )
+        assert (
+            local.edit_script.cigar()
+            == SmithWaterman(s, t, similarity, True).edit_script.cigar()
+        )
+
+        for type, w, is_similarity in [
+            (Alignment.AlignmentType.GLOBAL, distance, False),
+            (Alignment.AlignmentType.SEMI_GLOBAL, distance, False),
+            (Alignment.AlignmentType.LOCAL, similarity, True),
+        ]:
+            assert alignment_score(
+                s, t, w, type, is_similarity, threaded, 2, tile_size
+            ) == alignment_score(s, t, w, type, is_similarity)
+
+    with pytest.raises(ValueError):
+        NeedlemanWunsch("GATTACA", "GATTACA", distance, band=2, backend=threaded)
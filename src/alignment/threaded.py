@@ -0,0 +1,187 @@
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from kernels import LEFT, UP, __directions__, __next_row__
+from scoring import ScoringScheme
+
+# Default number of rows and columns of a tile
+TILE_SIZE = 2048
+
+
+def __tile__(
+    top: np.ndarray,
+    left: np.ndarray,
+    profile: np.ndarray,
+    s: np.ndarray,
+    deletion: np.ndarray,
+    insertion: np.ndarray,
+    is_similarity: bool,
+    local: bool,
+    rows: np.ndarray | None = None,
+    codes: np.ndarray | None = None,
+):
+    """
+    Computes a tile of the score matrix from the row above it (including the
+    corner on the left) and the column left of it, one row at a time.
+
+    The running minimum (or maximum) of the left candidates starts at the cell
+    left of the tile, which already accounts for everything further left, so
+    the rows equal those of the full matrix. With rows and codes, the scores and
+    direction codes of the tile are written into them.
+
+    Returns the last row (including the corner), the right column and the best
+    score of the tile.
+    """
+    insertion_prefix = np.zeros(len(top), dtype=int)
+    np.cumsum(insertion, out=insertion_prefix[1:])
+
+    row = top
+    right = np.empty(len(left), dtype=int)
+    best = None
+
+    for i in range(len(left)):
+        row, up, diagonal, candidates = __next_row__(
+            row,
+            left[i],
+            profile[s[i]],
+            deletion[i],
+            insertion_prefix,
+            is_similarity,
+            local,
+        )
+        right[i] = row[-1]
+
+        if local:
+            best = max(best or 0, int(row.max()))
+
+        if rows is not None:
+            rows[i] = row[1:]
+            codes[i] = __directions__(
+                row, up, diagonal, candidates, insertion, is_similarity, local
+            )
+
+    return row, right, best
+
+
+def __tiles__(n: int, m: int, tile_size: int):
+    """
+    Splits the rows and columns of an n x m matrix into tile boundaries and
+    groups the tiles by their anti-diagonal.
+    """
+    row_bounds = list(range(0, n, tile_size)) + [n]
+    column_bounds = list(range(0, m, tile_size)) + [m]
+    rows = len(row_bounds) - 1
+    columns = len(column_bounds) - 1
+
+    diagonals = [
+        [
+            (I, diagonal - I)
+            for I in range(max(0, diagonal - columns + 1), min(diagonal, rows - 1) + 1)
+        ]
+        for diagonal in range(rows + columns - 1)
+    ]
+
+    return row_bounds, column_bounds, diagonals
+
+
+def fill_threaded(
+    s: np.ndarray,
+    t: np.ndarray,
+    scoring: ScoringScheme,
+    is_similarity: bool,
+    local: bool,
+    free_row: bool,
+    free_column: bool,
+    threads: int | None = None,
+    tile_size: int = TILE_SIZE,
+    matrices: bool = True,
+):
+    """
+    Fills the score matrix tile by tile on a thread pool.
+
+    Tiles on the same anti-diagonal of tiles only depend on tiles of earlier
+    anti-diagonals, so they are computed concurrently. Each tile is a loop over
+    NumPy row kernels, which release the GIL on rows of a few thousand cells.
+    The borders between tiles are kept in one row per tile column and one
+    column per tile row.
+
+    With matrices, returns the full D and B like fill_matrices. Otherwise,
+    returns the last row, the last column and the best cell score, in
+    O(len(s) + len(t)) memory.
+    """
+    if tile_size < 1:
+        raise ValueError("Tile size must be positive")
+
+    n = len(s)
+    m = len(t)
+
+    profile = scoring.substitution[:, t].astype(int)
+    deletion = scoring.deletion[s].astype(int)
+    insertion = scoring.insertion[t].astype(int)
+
+    first_row = np.zeros(m + 1, dtype=int)
+    first_column = np.zeros(n + 1, dtype=int)
+    if not free_row:
+        np.cumsum(insertion, out=first_row[1:])
+    if not free_column:
+        np.cumsum(deletion, out=first_column[1:])
+
+    if matrices:
+        D = np.zeros((n + 1, m + 1), dtype=int)
+        B = np.zeros((n + 1, m + 1), dtype=np.uint8)
+        D[0] = first_row
+        D[:, 0] = first_column
+        if not free_row:
+            B[0, 1:] = LEFT
+        if not free_column:
+            B[1:, 0] = UP
+
+    row_bounds, column_bounds, diagonals = __tiles__(n, m, tile_size)
+
+    # Row above every tile column, including the corner, and column left of
+    # every tile row
+    bottoms = [
+        first_row[column_bounds[J] : column_bounds[J + 1] + 1]
+        for J in range(len(column_bounds) - 1)
+    ]
+    rights = [
+        first_column[row_bounds[I] + 1 : row_bounds[I + 1] + 1]
+        for I in range(len(row_bounds) - 1)
+    ]
+    best = 0
+
+    def compute(I: int, J: int):
+        i0, i1 = row_bounds[I], row_bounds[I + 1]
+        j0, j1 = column_bounds[J], column_bounds[J + 1]
+
+        return __tile__(
+            bottoms[J],
+            rights[I],
+            profile[:, j0:j1],
+            s[i0:i1],
+            deletion[i0:i1],
+            insertion[j0:j1],
+            is_similarity,
+            local,
+            D[i0 + 1 : i1 + 1, j0 + 1 : j1 + 1] if matrices else None,
+            B[i0 + 1 : i1 + 1, j0 + 1 : j1 + 1] if matrices else None,
+        )
+
+    with ThreadPoolExecutor(threads) as executor:
+        for diagonal in diagonals:
+            results = executor.map(lambda tile: compute(*tile), diagonal)
+
+            for (I, J), (bottom, right, tile_best) in zip(diagonal, results):
+                # The corner of the next tile column is the last cell of this one
+                bottoms[J] = bottom
+                rights[I] = right
+
+                if tile_best is not None:
+                    best = max(best, tile_best)
+
+    if matrices:
+        return D, B
+
+    last_row = np.concatenate([first_column[-1:]] + [bottom[1:] for bottom in bottoms])
+    last_column = np.concatenate([first_row[-1:]] + rights)
+
+    return last_row, last_column, best
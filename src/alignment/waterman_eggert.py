@@ -0,0 +1,167 @@
+import heapq
+import numpy as np
+from edit_script import DELETION, INSERTION, EditScript
+from kernels import NONE, __directions__, backtrack
+from scoring import ScoringScheme
+from typing import List
+
+
+def __masked_row__(
+    previous: np.ndarray,
+    first: int,
+    diagonal_scores: np.ndarray,
+    deletion: int,
+    insertion_prefix: np.ndarray,
+    mask: np.ndarray,
+):
+    """
+    Computes a row of a local similarity matrix like __next_row__, where the
+    masked cells are fixed to 0 and no path passes through them.
+
+    The running maximum of the left candidates restarts at every masked cell,
+    which is done in one accumulate by adding an offset that grows with every
+    masked cell.
+    """
+    up = previous[1:] + deletion
+    diagonal = previous[:-1] + diagonal_scores
+    best = np.maximum(up, diagonal)
+
+    row = np.empty_like(previous)
+    row[0] = first
+    row[1:] = np.maximum(best, 0)
+    row[mask] = 0
+    row -= insertion_prefix
+
+    segments = np.cumsum(mask)
+    offset = 2 * int(np.abs(row).max()) + 1
+    row += segments * offset
+    np.maximum.accumulate(row, out=row)
+    row -= segments * offset
+
+    row += insertion_prefix
+
+    return row, up, diagonal, best
+
+
+class RowMaxima:
+    """
+    Heap of the row maxima of a score matrix. Entries of rows that were recomputed
+    since are skipped when they come up.
+    """
+
+    def __init__(self, D: np.ndarray) -> None:
+        self.D = D
+        self.heap = [self.__entry__(i) for i in range(D.shape[0])]
+        heapq.heapify(self.heap)
+
+    def __entry__(self, i: int):
+        # Ties are broken by row and column, as D.argmax() does
+        j = int(self.D[i].argmax())
+        return -int(self.D.item(i, j)), i, j
+
+    def push(self, i: int) -> None:
+        heapq.heappush(self.heap, self.__entry__(i))
+
+    def pop(self):
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+
+            if entry == self.__entry__(entry[1]):
+                return -entry[0], entry[1], entry[2]
+
+        return 0, 0, 0
+
+
+def __path__(script: EditScript):
+    """
+    Yields the cells of D an edit script passes through, excluding its start.
+    """
+    i = script.s_start
+    j = script.t_start
+
+    for op, length in script.operations.tolist():
+        for _ in range(length):
+            i += op != DELETION
+            j += op != INSERTION
+            yield i, j
+
+
+def waterman_eggert(
+    D: np.ndarray,
+    B: np.ndarray,
+    s: np.ndarray,
+    t: np.ndarray,
+    scoring: ScoringScheme,
+    k: int,
+    min_score: int = 1,
+) -> List[EditScript]:
+    """
+    Finds up to k local alignments in decreasing order of their score, no two of
+    which share a cell of the matrix (Waterman and Eggert, 1987).
+
+    D and B are the filled matrices of a local similarity alignment and are
+    modified. After an alignment is reported, the cells of its path are set to 0.
+    Only the cells below and to the right of the path can change, so the rows
+    are recomputed from the first row of the path and from the column left of
+    it, until a row below the path does not change any more. The best remaining
+    cell is taken from a heap of the row maxima.
+    """
+    n, m = D.shape[0] - 1, D.shape[1] - 1
+
+    profile = scoring.substitution[:, t].astype(int)
+    deletion = scoring.deletion[s].astype(int)
+    insertion = scoring.insertion[t].astype(int)
+    insertion_prefix = np.zeros(m + 1, dtype=int)
+    np.cumsum(insertion, out=insertion_prefix[1:])
+
+    mask = np.zeros(D.shape, dtype=bool)
+    candidates = RowMaxima(D)
+    alignments = []
+
+    while len(alignments) < k:
+        score, i, j = candidates.pop()
+
+        if score < min_score:
+            break
+
+        script = backtrack(D, B, s, t, i, j, True)
+        alignments.append(script)
+
+        cells = list(__path__(script))
+        for cell in cells:
+            mask[cell] = True
+            D[cell] = 0
+            B[cell] = NONE
+
+        top = min(i for i, _ in cells)
+        bottom = max(i for i, _ in cells)
+        left = min(j for _, j in cells) - 1
+
+        prefix = insertion_prefix[left:] - insertion_prefix[left]
+
+        for i in range(top, n + 1):
+            row, up, diagonal, best = __masked_row__(
+                D[i - 1, left:],
+                D[i, left],
+                profile[s[i - 1], left:],
+                deletion[i - 1],
+                prefix,
+                mask[i, left:],
+            )
+
+            codes = __directions__(
+                row, up, diagonal, best, insertion[left:], True, True
+            )
+            codes[mask[i, left + 1 :]] = NONE
+
+            # Rows below an unchanged row do not change either
+            unchanged = (row == D[i, left:]).all()
+
+            D[i, left:] = row
+            B[i, left + 1 :] = codes
+            candidates.push(i)
+
+            if unchanged and i > bottom:
+                break
+
+    return alignments
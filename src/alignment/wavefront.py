@@ -0,0 +1,261 @@
+import numpy as np
+from edit_script import DELETION, INSERTION, MATCH, MISMATCH
+from edit_script import EditScript, EditScriptBuilder
+from scoring import ScoringScheme
+from typing import Dict, Tuple
+
+# Offset of diagonals a wavefront does not reach
+UNREACHED = -(2**62)
+
+# Wavefront of one score: the lowest diagonal and the furthest offsets (columns j)
+# reached on the diagonals k = j - i from there on
+Wavefront = Tuple[int, np.ndarray]
+
+
+def uniform_costs(scoring: ScoringScheme) -> Tuple[int, int] | None:
+    """
+    Returns the mismatch and gap costs of a distance scheme as built by
+    build_weight_matrix with free matches, or None for any other scheme.
+    """
+    size = len(scoring.alphabet)
+    diagonal = np.eye(size, dtype=bool)
+    mismatches = scoring.substitution[~diagonal]
+    gaps = np.concatenate([scoring.deletion, scoring.insertion])
+
+    if size == 0 or (scoring.substitution[diagonal] != 0).any():
+        return None
+
+    if (gaps != gaps[0]).any() or gaps[0] <= 0:
+        return None
+
+    if len(mismatches) == 0:
+        # A single character never mismatches
+        return 2 * int(gaps[0]), int(gaps[0])
+
+    if (mismatches != mismatches[0]).any() or mismatches[0] <= 0:
+        return None
+
+    return int(mismatches[0]), int(gaps[0])
+
+
+def __extend__(s: bytes, t: bytes, i: int, j: int) -> int:
+    """
+    Returns the length of the longest common prefix of s[i:] and t[j:].
+
+    Slices are compared as a whole, which is a memcmp. The step doubles while
+    the slices match and is halved again after the first mismatch, so a common
+    prefix of length l costs O(log l) comparisons.
+    """
+    limit = min(len(s) - i, len(t) - j)
+    length = 0
+    step = 8
+
+    while length < limit:
+        step = min(step, limit - length)
+
+        if s[i + length : i + length + step] == t[j + length : j + length + step]:
+            length += step
+            step *= 2
+        elif step == 1:
+            break
+        else:
+            step //= 2
+
+    return length
+
+
+def __lookup__(wavefront: Wavefront | None, lo: int, hi: int) -> np.ndarray:
+    """
+    Returns the offsets of the diagonals lo to hi, UNREACHED outside of the wavefront.
+    """
+    values = np.full(hi - lo + 1, UNREACHED, dtype=np.int64)
+
+    if wavefront is None:
+        return values
+
+    w_lo, offsets = wavefront
+    start = max(lo, w_lo)
+    stop = min(hi, w_lo + len(offsets) - 1)
+
+    if start <= stop:
+        values[start - lo : stop - lo + 1] = offsets[start - w_lo : stop - w_lo + 1]
+
+    return values
+
+
+def __candidates__(
+    wavefronts: Dict[int, Wavefront],
+    score: int,
+    lo: int,
+    hi: int,
+    mismatch: int,
+    gap: int,
+    n: int,
+    m: int,
+):
+    """
+    Computes the offsets on the diagonals lo to hi reached with the given score
+    before extending the matches, one array per predecessor: a mismatch on the
+    same diagonal, a gap in s from the diagonal below (a step left in D) and a
+    gap in t from the diagonal above (a step up in D).
+    """
+    k = np.arange(lo, hi + 1)
+
+    substituted = __lookup__(wavefronts.get(score - mismatch), lo, hi)
+    valid = (substituted >= 0) & (substituted < m) & (substituted - k < n)
+    substituted = np.where(valid, substituted + 1, UNREACHED)
+
+    left = __lookup__(wavefronts.get(score - gap), lo - 1, hi - 1)
+    valid = (left >= 0) & (left < m)
+    left = np.where(valid, left + 1, UNREACHED)
+
+    up = __lookup__(wavefronts.get(score - gap), lo + 1, hi + 1)
+    valid = (up >= 0) & (up - k - 1 < n)
+    up = np.where(valid, up, UNREACHED)
+
+    return substituted, left, up
+
+
+def __diagonals__(
+    wavefronts: Dict[int, Wavefront], score: int, mismatch: int, gap: int
+) -> Tuple[int, int] | None:
+    """
+    Returns the range of diagonals the wavefront of the given score can reach.
+    """
+    bounds = []
+
+    if score - mismatch in wavefronts:
+        lo, offsets = wavefronts[score - mismatch]
+        bounds.append((lo, lo + len(offsets) - 1))
+
+    if score - gap in wavefronts:
+        lo, offsets = wavefronts[score - gap]
+        bounds.append((lo - 1, lo + len(offsets)))
+
+    if not bounds:
+        return None
+
+    return min(lo for lo, _ in bounds), max(hi for _, hi in bounds)
+
+
+def __reached__(wavefront: Wavefront | None, k: int, m: int) -> bool:
+    if wavefront is None:
+        return False
+
+    lo, offsets = wavefront
+
+    return 0 <= k - lo < len(offsets) and offsets[k - lo] >= m
+
+
+def __traceback__(
+    wavefronts: Dict[int, Wavefront],
+    score: int,
+    mismatch: int,
+    gap: int,
+    n: int,
+    m: int,
+) -> EditScript:
+    """
+    Follows the predecessors from the last cell back to the first one. On every
+    wavefront, the matches between the predecessor and the furthest offset are
+    emitted as one run.
+    """
+    edits = EditScriptBuilder()
+    total = score
+    k = m - n
+    j = m
+
+    while score > 0:
+        substituted, left, up = __candidates__(
+            wavefronts, score, k, k, mismatch, gap, n, m
+        )
+        start = max(int(substituted[0]), int(left[0]), int(up[0]))
+
+        edits.add(MATCH, j - start)
+
+        if start == left[0]:
+            edits.add(DELETION)
+            k -= 1
+            j = start - 1
+            score -= gap
+        elif start == substituted[0]:
+            edits.add(MISMATCH)
+            j = start - 1
+            score -= mismatch
+        else:
+            edits.add(INSERTION)
+            k += 1
+            j = start
+            score -= gap
+
+    edits.add(MATCH, j)
+
+    return edits.build(0, n, 0, m, total)
+
+
+def wavefront_alignment(
+    s: str | np.ndarray,
+    t: str | np.ndarray,
+    scoring: ScoringScheme,
+    max_score: int | None = None,
+) -> EditScript | None:
+    """
+    Computes an optimal global alignment with the wavefront algorithm (WFA,
+    Marco-Sola et al. 2021) in O((len(s) + len(t)) * score) time.
+
+    Instead of filling D, the wavefront of every score holds the furthest cell
+    reached with that score on every diagonal. Each wavefront is derived from the
+    ones of score - mismatch and score - gap, and then extended along runs of
+    matches, which are free. The wavefronts are kept for the traceback.
+
+    Only distance schemes with free matches and uniform mismatch and gap costs
+    are supported. Returns None once the score exceeds max_score, so the caller
+    can fall back to dynamic programming for divergent sequences.
+    """
+    costs = uniform_costs(scoring)
+
+    if costs is None:
+        raise ValueError(
+            "Wavefront alignment requires free matches and uniform mismatch and "
+            "gap costs"
+        )
+
+    mismatch, gap = costs
+
+    s = scoring.encode(s)
+    t = scoring.encode(t)
+    n = len(s)
+    m = len(t)
+
+    s_bytes = s.tobytes()
+    t_bytes = t.tobytes()
+
+    wavefronts: Dict[int, Wavefront] = {
+        0: (0, np.array([__extend__(s_bytes, t_bytes, 0, 0)], dtype=np.int64))
+    }
+    score = 0
+
+    while not __reached__(wavefronts.get(score), m - n, m):
+        score += 1
+
+        if max_score is not None and score > max_score:
+            return None
+
+        diagonals = __diagonals__(wavefronts, score, mismatch, gap)
+
+        if diagonals is None:
+            continue
+
+        lo = max(diagonals[0], -n)
+        hi = min(diagonals[1], m)
+
+        candidates = __candidates__(wavefronts, score, lo, hi, mismatch, gap, n, m)
+        offsets = np.maximum.reduce(candidates).tolist()
+
+        for index, j in enumerate(offsets):
+            if j >= 0:
+                offsets[index] = j + __extend__(s_bytes, t_bytes, j - lo - index, j)
+
+        wavefronts[score] = (lo, np.array(offsets, dtype=np.int64))
+
+    return __traceback__(wavefronts, score, mismatch, gap, n, m)
@@ -0,0 +1,25 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict
+
+# State of a worker process, sent once when the process starts
+__worker__: Dict = {}
+
+
+def __init_worker__(state: Dict) -> None:
+    __worker__.update(state)
+
+
+def worker_pool(workers: int, state: Dict) -> ProcessPoolExecutor:
+    """
+    Starts a process pool whose workers receive the state once, instead of with
+    every task. Tasks submitted through with_state are called with it.
+    """
+    return ProcessPoolExecutor(workers, initializer=__init_worker__, initargs=(state,))
+
+
+def with_state(function: Callable, *args):
+    """
+    Calls function(state, *args) with the state of the current worker process.
+    In this process, call function with the state directly instead.
+    """
+    return function(__worker__, *args)
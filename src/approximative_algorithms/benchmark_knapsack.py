@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import random
+import timeit
+from knapsack import __knapsack_naive__, knapsack
+
+
+def random_items(count: int, max_value: int, max_weight: int = 100):
+    """
+    Generates random (weight, value) items.
+    """
+    return [
+        (random.randint(1, max_weight), random.randint(1, max_value))
+        for _ in range(count)
+    ]
+
+
+def benchmark_knapsack(counts, max_values, repeat: int, naive_limit: int):
+    """
+    Compares the cell-by-cell knapsack with the vectorized one for several item
+    counts and value ranges. The cell-by-cell solver only runs on tables of up to
+    naive_limit cells. The capacity is half the total weight.
+    """
+    print("items\tmax value\tcells\tnaive [s]\tvectorized [s]\tspeedup")
+
+    for count in counts:
+        for max_value in max_values:
+            items = random_items(count, max_value)
+            capacity = sum(w for w, _ in items) // 2
+            cells = (count + 1) * (sum(p for _, p in items) + 1)
+
+            def best(function):
+                return min(
+                    timeit.repeat(
+                        lambda: function(items, capacity), number=1, repeat=repeat
+                    )
+                )
+
+            vectorized = best(knapsack)
+
+            if cells <= naive_limit:
+                naive = best(__knapsack_naive__)
+                print(
+                    f"{count}\t{max_value}\t{cells}\t{naive:.4f}\t{vectorized:.4f}\t"
+                    f"{naive / vectorized:.1f}x"
+                )
+            else:
+                print(f"{count}\t{max_value}\t{cells}\t-\t{vectorized:.4f}\t-")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Knapsack benchmarks")
+    parser.add_argument(
+        "--counts",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000],
+        help="Numbers of items",
+    )
+    parser.add_argument(
+        "--max-values",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000],
+        help="Largest item values",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per run")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument(
+        "--naive-limit",
+        type=int,
+        default=2_000_000,
+        help="Largest table for the cell-by-cell solver",
+    )
+
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    benchmark_knapsack(args.counts, args.max_values, args.repeat, args.naive_limit)
+
+
+if __name__ == "__main__":
+    main()
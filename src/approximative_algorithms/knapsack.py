@@ -1,14 +1,29 @@
 #!/usr/bin/env python3
 
 import numpy as np
-from typing import List, Tuple
+from typing import Iterable, List, Tuple
 
 
-def knapsack(items: List[Tuple[int, int]], capacity: int):
+def __chosen_items__(take: np.ndarray, items: List[Tuple[int, int]], p: int):
     """
-    Knapsack problem solver using dynamic programming.
-    :param items: list of tuples (weight, value)
-    :return: tuple (max_value, max_weight)
+    Recovers the chosen items of value p from the bit-packed take matrix (or a
+    list of its rows), whose bit (k, p) is set if item k - 1 is taken in cell
+    (k, p).
+    """
+    chosen = set()
+
+    for k in range(len(items), 0, -1):
+        if take[k][p >> 3] & (0x80 >> (p & 7)):
+            chosen.add(k - 1)
+            p -= items[k - 1][1]
+
+    return chosen
+
+
+def __knapsack_naive__(items: List[Tuple[int, int]], capacity: int):
+    """
+    Knapsack solver that fills the table cell by cell.
+    Kept as a reference for the vectorized knapsack.
     """
 
     # Check if capacity is valid
@@ -18,15 +33,16 @@ def knapsack(items: List[Tuple[int, int]], capacity: int):
     max_k = len(items)
     max_p = sum([p for _, p in items])
 
-    # Create matrix
+    # Create matrices, the decisions are stored as one bit per cell
     S = np.zeros((max_k + 1, max_p + 1))
-    PI = np.ndarray((max_k + 1, max_p + 1), dtype=set)
+    take = np.zeros((max_k + 1, (max_p + 8) // 8), dtype=np.uint8)
+    taken = np.zeros(max_p + 1, dtype=bool)
 
     for k in range(max_k + 1):
+        taken[:] = False
+
         for p in range(max_p + 1):
             if k == 0:
-                PI[k, p] = set()
-
                 if p == 0:
                     S[k, p] = 0
                 else:
@@ -42,17 +58,254 @@ def knapsack(items: List[Tuple[int, int]], capacity: int):
                     and S[k - 1, p - p_k] + s_k <= S[k - 1, p]
                 ):
                     S[k, p] = S[k - 1, p - p_k] + s_k
-                    PI[k, p] = PI[k - 1, p - p_k].union({k - 1})
+                    taken[p] = True
                 else:
                     S[k, p] = S[k - 1, p]
-                    PI[k, p] = PI[k - 1, p]
+
+        take[k] = np.packbits(taken)
 
     # Find max position that is smaller or equal to capacity
     p = max_p
     while S[max_k, p] > capacity:
         p -= 1
 
-    return p, S[max_k, p], PI[max_k, p]
+    return p, S[max_k, p], __chosen_items__(take, items, p)
+
+
+def __add_item__(S: np.ndarray, s_k: int, p_k: int, capacity: int) -> np.ndarray:
+    """
+    Updates a row of minimum weights per value in place with one more item of
+    weight s_k and value p_k, and returns where the item is taken. Weights
+    above the capacity are capacity + 1.
+    """
+    taken = np.zeros(len(S), dtype=bool)
+
+    if p_k >= len(S):
+        return taken
+
+    previous = S[: len(S) - p_k]
+    candidates = previous + s_k
+
+    taken[p_k:] = (
+        (previous != capacity + 1) & (candidates <= capacity) & (candidates <= S[p_k:])
+    )
+
+    np.copyto(S[p_k:], candidates, where=taken[p_k:])
+
+    return taken
+
+
+def __min_weights__(items: List[Tuple[int, int]], max_p: int, capacity: int):
+    """
+    Computes the last row of minimum weights per value up to max_p, keeping only
+    that row.
+    """
+    S = np.full(max_p + 1, capacity + 1, dtype=np.int64)
+    S[0] = 0
+
+    for s_k, p_k in items:
+        __add_item__(S, s_k, p_k, capacity)
+
+    return S
+
+
+def __recover_items__(
+    items: List[Tuple[int, int]], indices: List[int], target: int, capacity: int
+):
+    """
+    Finds a subset of the items with the given indices of value target and
+    minimum weight, in the manner of Hirschberg's algorithm: the rows of both
+    halves of the items are computed up to target, the best split of the value
+    between them is chosen, and both halves are solved recursively.
+    """
+    if target == 0:
+        return set()
+
+    if len(indices) == 1:
+        return {indices[0]}
+
+    middle = len(indices) // 2
+    first = __min_weights__([items[i] for i in indices[:middle]], target, capacity)
+    second = __min_weights__([items[i] for i in indices[middle:]], target, capacity)
+
+    # Value of the first half, with the second half making up the rest
+    split = int(np.argmin(first + second[::-1]))
+    # Free the rows before recursing, otherwise every level keeps its own
+    del first, second
+
+    return __recover_items__(items, indices[:middle], split, capacity) | (
+        __recover_items__(items, indices[middle:], target - split, capacity)
+    )
+
+
+def knapsack(items: List[Tuple[int, int]], capacity: int, linear_space: bool = False):
+    """
+    Knapsack problem solver using dynamic programming.
+    :param items: list of tuples (weight, value)
+    :param linear_space: recover the items by divide and conquer in O(sum of
+        values) memory instead of storing a bit per cell
+    :return: tuple (max_value, max_weight, chosen item indices)
+
+    Row k holds the minimum weight of a subset of the first k items for every
+    total value p, or capacity + 1 if there is none within the capacity. It only
+    depends on row k - 1 shifted by the value of item k, so every row is
+    computed with a few whole-row operations and only two rows are kept.
+
+    In linear space, the recovery computes rows of half of the items at every
+    level of the recursion, which takes about twice as long as the table.
+    """
+
+    # Check if capacity is valid
+    if capacity < 0:
+        raise ValueError("Capacity must be positive")
+
+    max_k = len(items)
+    max_p = sum([p for _, p in items])
+
+    if linear_space:
+        S = __min_weights__(items, max_p, capacity)
+        p = int(np.flatnonzero(S <= capacity)[-1])
+        weight = int(S[p])
+        del S
+
+        return p, weight, __recover_items__(items, list(range(max_k)), p, capacity)
+
+    # The decisions are stored as one bit per cell
+    take = np.zeros((max_k + 1, (max_p + 8) // 8), dtype=np.uint8)
+
+    S = np.full(max_p + 1, capacity + 1, dtype=np.int64)
+    S[0] = 0
+
+    for k in range(1, max_k + 1):
+        s_k, p_k = items[k - 1]
+        take[k] = np.packbits(__add_item__(S, s_k, p_k, capacity))
+
+    # Find max value whose weight is smaller or equal to capacity
+    p = int(np.flatnonzero(S <= capacity)[-1])
+
+    return p, int(S[p]), __chosen_items__(take, items, p)
+
+
+def knapsack_fptas(items: List[Tuple[int, int]], capacity: int, epsilon: float):
+    """
+    Fully polynomial-time approximation scheme for the knapsack problem.
+    :param items: list of tuples (weight, value)
+    :param epsilon: relative error, 0 < epsilon < 1
+    :return: tuple (value, weight, chosen item indices, upper bound of the optimum)
+
+    The values are divided by K = epsilon * P / n, with P the largest value of
+    an item that fits, and rounded down. The exact solver on the scaled values
+    then has at most n^2 / epsilon + 1 columns, independent of the magnitude of
+    the values, and its solution is worth at least (1 - epsilon) times the
+    optimum. Rounding loses less than K per item, so the optimum is at most
+    K * (scaled optimum + n). With K <= 1, the values are not scaled and the
+    result is exact.
+    """
+    if not 0 < epsilon < 1:
+        raise ValueError("Epsilon must be between 0 and 1")
+
+    if capacity < 0:
+        raise ValueError("Capacity must be positive")
+
+    # Items heavier than the knapsack can never be taken
+    indices = [i for i, (w, _) in enumerate(items) if w <= capacity]
+    max_value = max([items[i][1] for i in indices], default=0)
+
+    if max_value == 0:
+        return 0, 0, set(), 0
+
+    n = len(indices)
+    K = epsilon * max_value / n
+
+    if K <= 1:
+        value, weight, chosen = knapsack([items[i] for i in indices], capacity)
+        return value, weight, {indices[i] for i in chosen}, value
+
+    scaled = [(items[i][0], int(items[i][1] // K)) for i in indices]
+    scaled_value, weight, chosen = knapsack(scaled, capacity)
+
+    chosen = {indices[i] for i in chosen}
+    value = sum(items[i][1] for i in chosen)
+    bound = min(K * (scaled_value + n), value / (1 - epsilon))
+
+    return value, weight, chosen, bound
+
+
+class KnapsackSolver:
+    """
+    Knapsack table that answers queries for many capacities.
+
+    The table of minimum weights per value is built once without a capacity, so
+    its last row answers every capacity: the best value is the largest p whose
+    suffix minimum of weights fits, found by binary search. Items are added one
+    row at a time, and the chosen items are only recovered when queried.
+    """
+
+    # Capacity of the table, large enough to never clamp a weight
+    UNBOUNDED = np.iinfo(np.int64).max // 2
+
+    def __init__(self, items: Iterable[Tuple[int, int]] = ()) -> None:
+        items = list(items)
+
+        self.items = []
+        self.max_p = 0
+        self.take = [np.zeros(1, dtype=np.uint8)]
+
+        # Room for the values of all initial items, so they are not copied
+        self.S = np.full(
+            sum([p for _, p in items]) + 1, self.UNBOUNDED + 1, dtype=np.int64
+        )
+        self.S[0] = 0
+
+        self.__suffix_minima = None
+        self.__chosen = {}
+
+        for weight, value in items:
+            self.add_item(weight, value)
+
+    def add_item(self, weight: int, value: int) -> int:
+        """
+        Appends one row for a new item and returns its index.
+        """
+        if weight < 0 or value < 0:
+            raise ValueError("Weight and value must not be negative")
+
+        self.items.append((weight, value))
+        self.max_p += value
+
+        missing = self.max_p + 1 - len(self.S)
+        if missing > 0:
+            self.S = np.concatenate(
+                (self.S, np.full(missing, self.UNBOUNDED + 1, dtype=np.int64))
+            )
+
+        taken = __add_item__(self.S, weight, value, self.UNBOUNDED)
+        self.take.append(np.packbits(taken[: self.max_p + 1]))
+
+        self.__suffix_minima = None
+        self.__chosen = {}
+
+        return len(self.items) - 1
+
+    def best(self, capacity: int):
+        """
+        Solves the knapsack problem for one capacity.
+        :return: tuple (max_value, max_weight, chosen item indices)
+        """
+        if capacity < 0:
+            raise ValueError("Capacity must be positive")
+
+        if self.__suffix_minima is None:
+            self.__suffix_minima = np.minimum.accumulate(self.S[::-1])[::-1]
+
+        # The suffix minima are non-decreasing, and the largest value whose
+        # suffix minimum fits also fits itself
+        p = int(np.searchsorted(self.__suffix_minima, capacity, "right")) - 1
+
+        if p not in self.__chosen:
+            self.__chosen[p] = __chosen_items__(self.take, self.items, p)
+
+        return p, int(self.S[p]), set(self.__chosen[p])
 
 
 if __name__ == "__main__":
@@ -74,13 +327,30 @@ if __name__ == "__main__":
         default=5,
         required=False,
     )
+    parser.add_argument(
+        "--linear-space",
+        help="recover the items by divide and conquer in linear memory",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--epsilon",
+        "-e",
+        help="relative error of the approximation scheme, exact if omitted",
+        type=float,
+        default=None,
+        required=False,
+    )
 
     args = parser.parse_args()
 
     items = [(int(w), int(p)) for w, p in [i.split(":") for i in args.items.split(";")]]
     capacity = args.capacity
 
-    max_value, weight, items = knapsack(items, capacity)
+    if args.epsilon is None:
+        max_value, weight, items = knapsack(items, capacity, args.linear_space)
+    else:
+        max_value, weight, items, bound = knapsack_fptas(items, capacity, args.epsilon)
+        print("Upper bound:", bound)
 
     print("Max value:", max_value)
     print("Weight:", weight)
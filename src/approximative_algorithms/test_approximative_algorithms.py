@@ -1,4 +1,6 @@
-from knapsack import knapsack
+import itertools
+import random
+from knapsack import KnapsackSolver, __knapsack_naive__, knapsack, knapsack_fptas
 import pytest
 
 
@@ -14,3 +16,106 @@ def test_knapsack():
 
     with pytest.raises(ValueError):
         knapsack(items, -1)
+
+
+def test_knapsack_chosen_items():
+    random.seed(21)
+
+    for _ in range(50):
+        items = [
+            (random.randint(0, 10), random.randint(0, 12))
+            for _ in range(random.randint(0, 8))
+        ]
+        capacity = random.randint(0, 30)
+
+        best = max(
+            sum(items[i][1] for i in subset)
+            for r in range(len(items) + 1)
+            for subset in itertools.combinations(range(len(items)), r)
+            if sum(items[i][0] for i in subset) <= capacity
+        )
+
+        max_value, weight, chosen = knapsack(items, capacity)
+
+        assert max_value == best
+        assert sum(items[i][1] for i in chosen) == max_value
+        assert sum(items[i][0] for i in chosen) == weight <= capacity
+
+
+def test_vectorized_knapsack():
+    random.seed(22)
+
+    for _ in range(50):
+        items = [
+            (random.randint(0, 20), random.randint(0, 20))
+            for _ in range(random.randint(0, 15))
+        ]
+        capacity = random.randint(0, 100)
+
+        assert knapsack(items, capacity) == __knapsack_naive__(items, capacity)
+
+
+def test_knapsack_fptas():
+    random.seed(23)
+
+    for _ in range(50):
+        items = [
+            (random.randint(0, 10), random.randint(0, 10 ** random.randint(1, 6)))
+            for _ in range(random.randint(0, 9))
+        ]
+        capacity = random.randint(0, 30)
+        epsilon = random.choice([0.05, 0.2, 0.5])
+
+        optimum = knapsack(items, capacity)[0]
+        value, weight, chosen, bound = knapsack_fptas(items, capacity, epsilon)
+
+        assert (1 - epsilon) * optimum <= value <= optimum <= bound
+        assert sum(items[i][1] for i in chosen) == value
+        assert sum(items[i][0] for i in chosen) == weight <= capacity
+
+    # Small values are solved exactly
+    assert knapsack_fptas([(3, 1), (4, 2), (2, 3)], 5, 0.5) == (4, 5, {0, 2}, 4)
+
+    with pytest.raises(ValueError):
+        knapsack_fptas([(3, 1)], 5, 1)
+
+
+def test_linear_space_knapsack():
+    random.seed(24)
+
+    for _ in range(50):
+        items = [
+            (random.randint(0, 10), random.randint(0, 12))
+            for _ in range(random.randint(0, 12))
+        ]
+        capacity = random.randint(0, 40)
+
+        max_value, weight, chosen = knapsack(items, capacity, linear_space=True)
+
+        assert (max_value, weight) == knapsack(items, capacity)[:2]
+        assert sum(items[i][1] for i in chosen) == max_value
+        assert sum(items[i][0] for i in chosen) == weight
+
+    assert knapsack([(3, 1), (4, 2), (2, 3)], 5, linear_space=True) == (4, 5, {0, 2})
+
+
+def test_knapsack_solver():
+    random.seed(25)
+    items = [(random.randint(0, 10), random.randint(0, 12)) for _ in range(12)]
+
+    solver = KnapsackSolver(items[:6])
+    for weight, value in items[6:]:
+        solver.add_item(weight, value)
+
+    for capacity in range(0, 60, 3):
+        max_value, weight, chosen = solver.best(capacity)
+
+        assert (max_value, weight) == knapsack(items, capacity)[:2]
+        assert sum(items[i][1] for i in chosen) == max_value
+        assert sum(items[i][0] for i in chosen) == weight
+
+    assert KnapsackSolver([(3, 1), (4, 2), (2, 3)]).best(5) == (4, 5, {0, 2})
+    assert KnapsackSolver().best(5) == (0, 0, set())
+
+    with pytest.raises(ValueError):
+        solver.best(-1)